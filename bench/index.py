@@ -0,0 +1,59 @@
+import argparse
+import time
+
+from uflascrape import model, query
+from uflascrape.model import Disciplina, _RefCurso, _RefLocal, _RefProfessor
+
+from .snapshot import generate
+
+def timed(fn, seconds: float) -> tuple[float, object]:
+    n = 0
+    start = time.perf_counter()
+    while True:
+        result = fn()
+        n += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds: return elapsed / n, result
+
+# what the index answers, by scanning every oferta instead
+def scan_professor(prof: str, periodo: str) -> set[tuple[str, str]]:
+    out = set()
+    for d in Disciplina._values():
+        for o in d.ofertas.get(periodo, []):
+            profs = [o.professor_principal, *o.professores_alocados, *o.professores_visitantes]
+            if any(p is not None and _RefProfessor.r(p).key == prof for p in profs):
+                out.add((d.key, o.turma))
+    return out
+
+def scan_local(local: str, dia: int, periodo: str) -> set[tuple[str, str]]:
+    return {(d.key, o.turma) for d in Disciplina._values() for o in d.ofertas.get(periodo, [])
+            for h in o.horarios if _RefLocal.r(h.local).key == local and h.dia == dia}
+
+def scan_curso(curso: str, periodo: str) -> set[str]:
+    return {d.key for d in Disciplina._values() for o in d.ofertas.get(periodo, []) if _RefCurso.r(o.curso).key == curso}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara query.index() com varreduras de Disciplina.ofertas.')
+    parser.add_argument('--disciplinas', type=int, default=3000)
+    parser.add_argument('--segundos', type=float, default=0.5)
+    args = parser.parse_args()
+
+    model.load(generate(args.disciplinas), trusted=True)
+    periodo, prof, local, dia, curso = '2023/2 - Campus Sede', 'Prof 7', 'PV4-018', 2, 'G007'
+    t = time.perf_counter()
+    idx = query.index()
+    print(f'query.index() {time.perf_counter() - t:.2f} s')
+
+    cases = {
+        'professor': (lambda: scan_professor(prof, periodo),
+                      lambda: {(h.disciplina.key, h.oferta.turma) for h in idx.by_professor(prof, periodo)}),
+        'local + dia': (lambda: scan_local(local, dia, periodo),
+                        lambda: {(h.disciplina.key, h.oferta.turma) for h, _ in idx.by_local(local, dia, periodo)}),
+        'disciplinas do curso': (lambda: scan_curso(curso, periodo),
+                                 lambda: {d.key for d in idx.disciplinas(curso, periodo)}),
+    }
+    for name, (scan, indexed) in cases.items():
+        t_scan, expected = timed(scan, args.segundos)
+        t_idx, got = timed(indexed, args.segundos)
+        assert got == expected, name
+        print(f'{name:22s} varredura {t_scan * 1e3:8.3f} ms  índice {t_idx * 1e3:8.3f} ms  {len(got)} resultados')
@@ -0,0 +1,35 @@
+import random
+
+# synthetic SIG pages shaped like the recorded ones, deterministic per index
+
+def _p(k: str, v: object) -> str:
+    return f'<p><strong>{k}:</strong> {v}</p>'
+
+def oferta_pub_page(i: int) -> str:
+    # consultar_horario_pub, op=abrir
+    rnd = random.Random(i)
+    busy = {(rnd.randrange(1, 8), h) for _ in range(3) for h in [rnd.randrange(7, 21)] for h in (h, h + 1)}
+    rows = []
+    for h in range(7, 23):
+        tds = [f'<td>{h}:00</td>']
+        for d in range(1, 8):
+            if (d, h) in busy:
+                tds.append(f'<td><div class="ocupado"><abbr title="Pavilhão {i % 50} Sala {h} (Capacidade Original: 60)">PV{i % 50}-{d}</abbr></div></td>')
+            else:
+                tds.append('<td></td>')
+        rows.append('<tr>' + ''.join(tds) + '</tr>')
+    profs = ''.join(f'<li>Professor {i % 300 + j} (DEP{j})</li>' for j in range(2))
+    dados = _p('Turma', f'{i % 9}A') + _p('Oferta de Curso', f'G{i % 40:03d} - Curso') + _p('Docente Principal', f'Professor {i % 300} (DCC)') + _p('Situação', 'Ativa')
+    return (f'<html><body><div class="dados">{dados}</div>'
+            f'<div class="horario_oferta"><table><thead><tr><th>h</th></tr></thead><tbody>{"".join(rows)}</tbody></table>'
+            f'<p><strong>Docentes Alocados</strong></p><ul>{profs}</ul><p><strong>Docentes Visitantes</strong></p><ul></ul></div></body></html>')
+
+def oferta_page(i: int) -> str:
+    # consultar_horario, op=abrir
+    fs = ''.join(f'<fieldset class="{c}">{_p("Vagas Oferecidas", 40)}{_p("Vagas Ocupadas", 30)}{_p("Vagas Restantes", "10*")}{_p("Solicitações Pendentes", 2)}</fieldset>'
+                 for c in ('vagas_normais', 'vagas_especiais'))
+    aulas = [('Segunda-feira', '08:00 - 09:40'), ('Quarta-feira', '10:00 - 11:40'), ('Sexta-feira', 'Sem horário definido')]
+    rows = ''.join(f'<tr><td><abbr title="Sala {j}">S{i % 80}-{j}</abbr></td><td>60</td><td>55</td><td>T</td><td>{d}</td><td>{h}</td></tr>'
+                   for j, (d, h) in enumerate(aulas))
+    return (f'<html><body>{_p("Situação", "Ativa")}{_p("Oferta de Curso", "G001")}{_p("Turma", f"{i % 9}B")}{fs}'
+            f'<table><thead><tr><th>x</th></tr></thead><tbody>{rows}</tbody></table></body></html>')
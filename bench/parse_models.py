@@ -0,0 +1,41 @@
+import argparse
+import time
+
+from uflascrape.model import _refs
+from uflascrape.sig import parser
+from uflascrape.sig.parser import parse_html, parse_oferta, parse_oferta_pub
+
+from .pages import oferta_page, oferta_pub_page
+
+def best(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        _refs.clear()
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return min(times)
+
+def registry() -> dict[str, dict]:
+    return {cls.__name__: {k: v.model_dump() for k, v in refs.items()} for cls, refs in _refs.items()}
+
+if __name__ == '__main__':
+    argp = argparse.ArgumentParser(description='Compara os modelos do parser com e sem validação (UFLASCRAPE_VALIDATE).')
+    argp.add_argument('--paginas', type=int, default=300)
+    argp.add_argument('--repeat', type=int, default=5)
+    args = argp.parse_args()
+    n = args.paginas
+
+    for fn, page in ((parse_oferta, oferta_page), (parse_oferta_pub, oferta_pub_page)):
+        texts = [page(i) for i in range(n)]
+        results = {}
+        for validate in (True, False):
+            parser.VALIDATE = validate
+            html = best(lambda: [parse_html(t) for t in texts], args.repeat)
+            roots = [parse_html(t) for t in texts]
+            models = best(lambda: [fn(r) for r in roots], args.repeat)
+            _refs.clear()
+            results[validate] = [fn(r).model_dump() for r in roots], registry()
+            mode = 'validado ' if validate else 'construct'
+            print(f'{fn.__name__:16s} {mode}  parse_html {html / n * 1e6:6.0f} us/página  a partir da árvore {models / n * 1e6:6.0f} us/página')
+        assert results[True] == results[False], fn.__name__
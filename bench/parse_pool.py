@@ -0,0 +1,48 @@
+import argparse
+import pickle
+import time
+
+from uflascrape.model import _refs
+from uflascrape.sig.parser import parse_html, parse_oferta, parse_oferta_pub
+from uflascrape.sig.pool import ParsePool, _parse
+
+from .pages import oferta_page, oferta_pub_page
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara o parse no processo com o ParsePool.')
+    parser.add_argument('--paginas', type=int, default=1000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+    n = args.paginas
+
+    for fn, page in ((parse_oferta, oferta_page), (parse_oferta_pub, oferta_pub_page)):
+        texts = [page(i) for i in range(n)]
+        _refs.clear()
+        t = time.perf_counter()
+        for text in texts:
+            fn(parse_html(text))
+        inproc = time.perf_counter() - t
+        _refs.clear()
+        sample = texts[:100]
+        packed = sum(len(pickle.dumps(_parse(fn, text))) for text in sample) / len(sample)
+        raw = sum(len(text.encode()) for text in sample) / len(sample)
+        _refs.clear()
+        print(f'{fn.__name__}: no processo {n / inproc:.0f} páginas/s ({inproc / n * 1e6:.0f} us/página), '
+              f'resultado {packed:.0f} B/página contra {raw:.0f} B de HTML')
+
+        for workers in args.workers:
+            with ParsePool(workers) as pool:
+                list(pool.map(fn, texts[:50]))  # workers up before timing
+                _refs.clear()
+                merge = 0.0
+                def timed(parsed, _merge=pool.merge):
+                    global merge
+                    t = time.perf_counter()
+                    r = _merge(parsed)
+                    merge += time.perf_counter() - t
+                    return r
+                pool.merge = timed
+                t = time.perf_counter()
+                list(pool.map(fn, texts))
+                elapsed = time.perf_counter() - t
+            print(f'  pool {workers}: {n / elapsed:.0f} páginas/s, merge no processo principal {merge / n * 1e6:.0f} us/página')
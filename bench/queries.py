@@ -0,0 +1,58 @@
+import argparse
+import os
+import sqlite3
+import time
+
+from uflascrape import model
+from uflascrape.model import Curso, Disciplina, Professor
+from uflascrape.sql import load_sqlite, query_latency
+
+from .snapshot import generate
+
+def _params(conn: sqlite3.Connection, periodo: str) -> dict[str, object]:
+    # the busiest curso, local, professor and disciplina of the periodo, so every query returns rows
+    def top(sql: str) -> object:
+        return conn.execute(sql, (periodo,)).fetchone()[0]
+    return {
+        'periodo': periodo,
+        'curso': top('SELECT id_curso FROM OfertasDisciplina WHERE id_periodo = ? GROUP BY id_curso ORDER BY count(*) DESC'),
+        'disciplina': top('SELECT id_disc FROM OfertasDisciplina WHERE id_periodo = ? GROUP BY id_disc ORDER BY count(*) DESC'),
+        'local': top('SELECT a.nome_local FROM Aulas a JOIN OfertasDisciplina o USING (id_oferta) '
+                     'WHERE o.id_periodo = ? GROUP BY a.nome_local ORDER BY count(*) DESC'),
+        'professor': top('SELECT p.nome_prof FROM Professores p JOIN Leciona l USING (id_prof) JOIN OfertasDisciplina o USING (id_oferta) '
+                         'WHERE o.id_periodo = ? GROUP BY p.id_prof ORDER BY count(*) DESC'),
+        'dia': 'segunda',
+        'hora': 10,
+    }
+
+def _report(title: str, latencies: dict[str, tuple[float, int]]) -> None:
+    print(title)
+    for name, (seconds, rows) in latencies.items():
+        print(f'  {name:20s} {seconds * 1e3:8.3f} ms  {rows} linhas')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mede a latência das consultas do front end (sql.QUERIES).')
+    parser.add_argument('--db', default=':memory:', help='banco SQLite a criar (padrão: em memória)')
+    parser.add_argument('--disciplinas', type=int, default=3000)
+    parser.add_argument('--segundos', type=float, default=0.5, help='tempo de execução de cada consulta')
+    parser.add_argument('--sem-indices', action='store_true', help='mede também sem os índices secundários')
+    args = parser.parse_args()
+
+    model.load(generate(args.disciplinas), trusted=True)
+    if args.db != ':memory:' and os.path.exists(args.db):
+        os.remove(args.db)
+    conn = sqlite3.connect(args.db)
+    t = time.perf_counter()
+    load_sqlite(conn, list(Curso._values()), list(Disciplina._values()), list(Professor._values()))
+    conn.commit()
+    counts = {table: conn.execute(f'SELECT count(*) FROM {table}').fetchone()[0] for table in ('OfertasDisciplina', 'Aulas', 'Leciona')}
+    print(f'load_sqlite {time.perf_counter() - t:.2f} s, ' + ', '.join(f'{n} {table}' for table, n in counts.items()))
+
+    periodo = conn.execute('SELECT max(id_periodo) FROM OfertasDisciplina').fetchone()[0]
+    params = _params(conn, periodo)
+    _report('com índices', query_latency(conn, params, args.segundos))
+    if args.sem_indices:
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'").fetchall():
+            conn.execute(f'DROP INDEX {name}')
+        conn.execute('ANALYZE')
+        _report('sem índices', query_latency(conn, params, args.segundos))
@@ -0,0 +1,68 @@
+from typing import Any, Sequence
+import argparse
+import json
+import random
+
+from uflascrape import model
+from uflascrape.model import Curso, Disciplina, Local, Periodo, Professor
+
+PERIODOS = ('2022/1 - Campus Sede', '2022/2 - Campus Sede', '2023/1 - Campus Sede', '2023/2 - Campus Sede')
+
+def generate(n_disc: int = 3000, periodos: Sequence[str] = PERIODOS, seed: int = 0) -> dict[str, Any]:
+    # a campus-sized registry, returned as a dump() snapshot; the registry is left empty
+    rnd = random.Random(seed)
+    model._refs.clear()
+    profs = [Professor(nome=f'Prof {i}', departamento=f'DEP{i % 20}') for i in range(600)]
+    locais = [Local(abbr=f'PV{i // 50}-{i % 50:03}', local=f'Pavilhao {i // 50} sala {i % 50}', ocupacao=rnd.randint(20, 120))
+              for i in range(300)]
+    for i, p in enumerate(periodos):
+        Periodo(nome=p, sig_cod_int=str(100 + i))
+    cursos = [Curso(cod=f'G{i:03}', sig_cod_int=i, nome=f'Curso {i}') for i in range(40)]
+
+    def vagas() -> dict[str, int]:
+        return dict(oferecidas=40, ocupadas=rnd.randint(0, 40), restantes=rnd.randint(0, 40), pendentes=rnd.randint(0, 5))
+
+    for i in range(n_disc):
+        ofertas = {}
+        for p in periodos:
+            turmas = []
+            for t in range(rnd.randint(1, 5)):
+                horarios = []
+                for _ in range(rnd.randint(1, 3)):
+                    h = rnd.randint(7, 20)
+                    horarios.append(dict(dia=rnd.randint(1, 5), inicio=dict(hora=h, minuto=0), fim=dict(hora=h + 2, minuto=0),
+                                         local=rnd.choice(locais).abbr))
+                turmas.append(dict(situacao='Aberta', turma=chr(65 + t), curso=rnd.choice(cursos).cod,
+                                   professor_principal=rnd.choice(profs).nome,
+                                   professores_alocados=[rnd.choice(profs).nome], professores_visitantes=[],
+                                   normal=vagas(), especial=vagas(), horarios=horarios))
+            ofertas[p] = turmas
+        Disciplina(cod=f'GCC{i:04}', nome=f'Disciplina {i}', creditos=4, ofertas=ofertas)
+
+    discs = [d.cod for d in Disciplina._values()]
+    for c in cursos:
+        mat = Curso.MatrizCurricular(cod=f'{c.cod}M', sig_cod_int=1, nome='m', descricao='d', periodos=8,
+                                     min_periodos=8, max_periodos=14, vagas=40)
+        sample = rnd.sample(discs, min(60, len(discs)))
+        for j, d in enumerate(sample):
+            prev = sample[max(0, j - 12):j]
+            dm = Curso.MatrizCurricular.DisciplinaMatriz(disc=d, percentual=0, reqs_fortes=rnd.sample(prev, min(len(prev), 2)),
+                                                         reqs_minimos=[], coreqs=[])
+            if j < 48:
+                mat.obrigatorias.setdefault(j // 6 + 1, []).append(dm)
+            else:
+                mat.eletivas.setdefault('Cat A', []).append(dm)
+        c.matrizes.append(mat)
+
+    data = model.dump()
+    model._refs.clear()
+    return data
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera um snapshot sintético do tamanho do campus.')
+    parser.add_argument('saida', help='arquivo JSON de saída')
+    parser.add_argument('--disciplinas', type=int, default=3000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(generate(args.disciplinas, seed=args.seed), f, indent='\t')
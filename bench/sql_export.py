@@ -0,0 +1,79 @@
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from io import StringIO
+
+from uflascrape import model
+from uflascrape.model import Curso, Disciplina, Professor
+from uflascrape.sql import load_sqlite, write_sql, write_sql_changes
+
+from .snapshot import generate
+
+TABLES = ('Cursos', 'Disciplinas', 'DisciplinasMatriz', 'Periodos', 'Professores', 'OfertasDisciplina', 'Locais', 'Aulas', 'Leciona')
+
+def contents(conn: sqlite3.Connection) -> dict[str, list[tuple]]:
+    return {t: sorted(conn.execute(f'SELECT * FROM {t}').fetchall(), key=repr) for t in TABLES}
+
+def best(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return min(times)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compara as formas de levar o registro para o SQLite.')
+    parser.add_argument('--disciplinas', type=int, default=3000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--alteradas', type=int, default=50, help='ofertas alteradas antes da exportação incremental')
+    args = parser.parse_args()
+
+    model.load(generate(args.disciplinas), trusted=True)
+    registry = list(Curso._values()), list(Disciplina._values()), list(Professor._values())
+    tmp = tempfile.mkdtemp()
+    def db(name: str) -> sqlite3.Connection:
+        path = os.path.join(tmp, name)
+        if os.path.exists(path): os.remove(path)
+        return sqlite3.connect(path)
+
+    sb = StringIO()
+    write_sql(sb, *registry)
+    script = sb.getvalue()
+    print(f'd.sql {len(script) / 2**20:.1f} MiB')
+
+    def build_and_replay() -> None:
+        f = StringIO()
+        write_sql(f, *registry)
+        db('replay.db').executescript(f.getvalue())
+    def direct() -> None:
+        conn = db('direct.db')
+        load_sqlite(conn, *registry)
+        conn.commit()
+    print(f'executescript(d.sql)        {best(lambda: db("replay.db").executescript(script), args.repeat):.2f} s')
+    print(f'write_sql + executescript   {best(build_and_replay, args.repeat):.2f} s')
+    print(f'load_sqlite                 {best(direct, args.repeat):.2f} s')
+    full = db('replay.db')
+    full.executescript(script)
+    assert contents(full) == contents(sqlite3.connect(os.path.join(tmp, 'direct.db')))
+
+    # incremental: change some vagas, export only the difference and apply it
+    state = write_sql_changes(StringIO(), {}, *registry)
+    rnd = random.Random(0)
+    ofertas = [o for d in registry[1] for os_ in d.ofertas.values() for o in os_ if o.normal is not None]
+    for o in rnd.sample(ofertas, args.alteradas):
+        o.normal = o.normal.model_copy(update={'restantes': o.normal.restantes + 1})
+    t = time.perf_counter()
+    changes = StringIO()
+    write_sql_changes(changes, state, *registry)
+    written = time.perf_counter() - t
+    t = time.perf_counter()
+    full.executescript(changes.getvalue())
+    applied = time.perf_counter() - t
+    print(f'incremental ({args.alteradas} ofertas): write_sql_changes {written:.2f} s, '
+          f'{len(changes.getvalue()) / 2**10:.0f} KiB, aplicado em {applied * 1e3:.0f} ms')
+    direct()
+    assert contents(full) == contents(sqlite3.connect(os.path.join(tmp, 'direct.db')))
@@ -0,0 +1,36 @@
+import argparse
+import gc
+import json
+import time
+
+from uflascrape import model
+
+from .snapshot import generate
+
+def best(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        model._refs.clear()
+        gc.collect()
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return min(times)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mede o tempo de carga de um snapshot.')
+    parser.add_argument('snapshot', nargs='?', help='snapshot JSON (padrão: gera um com bench.snapshot)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.snapshot:
+        with open(args.snapshot, encoding='utf-8') as f:
+            text = f.read()
+    else:
+        text = json.dumps(generate(), indent='\t')
+    data = json.loads(text)
+    n = sum(len(o) for d in data['disciplinas'] for o in d['ofertas'].values())
+    print(f'{len(text) / 2**20:.1f} MiB, {len(data["disciplinas"])} disciplinas, {n} ofertas')
+    print(f'json.loads            {best(lambda: json.loads(text), args.repeat):.3f} s')
+    print(f'load                  {best(lambda: model.load(data), args.repeat):.3f} s')
+    print(f'load(trusted=True)    {best(lambda: model.load(data, trusted=True), args.repeat):.3f} s')
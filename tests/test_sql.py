@@ -0,0 +1,19 @@
+import sqlite3
+
+from uflascrape.model import Curso, Disciplina, Professor, _refs
+from uflascrape.sql import load_sqlite, read_sqlite
+
+def test_horario_sem_dia_round_trip() -> None:
+    _refs.clear()
+    Disciplina.model_validate({'cod': 'GCC101', 'nome': 'Teste', 'creditos': 4, 'ofertas': {'2024/1': [{
+        'situacao': '', 'turma': '10A', 'curso': 'G001', 'professor_principal': None, 'professores_alocados': [],
+        'professores_visitantes': [], 'normal': None, 'especial': None, 'semestre': None, 'bimestre': None,
+        'horarios': [{'dia': -1, 'inicio': {'hora': 8, 'minuto': 0}, 'fim': {'hora': 10, 'minuto': 0}, 'local': 'PV1'},
+                     {'dia': 2, 'inicio': {'hora': 14, 'minuto': 0}, 'fim': {'hora': 16, 'minuto': 0}, 'local': 'PV2'}]}]}})
+    conn = sqlite3.connect(':memory:')
+    load_sqlite(conn, list(Curso._values()), list(Disciplina._values()), list(Professor._values()))
+    _refs.clear()
+    read_sqlite(conn)
+    horarios = Disciplina._get('GCC101').ofertas['2024/1'][0].horarios
+    assert [(h.dia, h.inicio.hora, h.fim.hora, h.local.key) for h in horarios] == [(-1, 8, 10, 'PV1'), (2, 14, 16, 'PV2')]
+    _refs.clear()
@@ -9,11 +9,22 @@ import html.parser
 import traceback
 import re
 import json
-from typing import Any
+import gzip
+import os
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator
 from logging import info, debug
 from urllib.parse import urlencode
 from dataclasses import asdict
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/111.0'
 DEFAULT_SIG_URL = 'https://sig.ufla.br{path}'
 DEFAULT_SIG_MODULES = {
@@ -100,6 +111,12 @@ class MatInfo:
                 f'- Vagas Restantes: {self.vagas_restantes}\n'
                 f'- Solicitações Pendentes: {self.solicitacoes_pendentes}')
 
+# weekly slot bitmasks of the v2 export: bit dia * SLOT_HOURS + (hora - SLOT_FIRST_HOUR),
+# rebuilt by the web tool in SLOT_WORDS 32-bit words (two days each) to AND them
+SLOT_FIRST_HOUR = 7
+SLOT_HOURS = 16
+SLOT_WORDS = 4
+
 dias = ['domingo', 'segunda-feira', 'terça-feira', 'quarta-feira', 'quinta-feira', 'sexta-feira', 'sábado', 'nenhum']
 
 @dataclasses.dataclass
@@ -189,6 +206,13 @@ class HorarioLocal:
         fim = self.fim.minuto // 10
         horarios.append((salaidx, tipo, dia, inicio, fim))
 
+    def slots(self) -> int:
+        if not 0 <= self.dia.num < 7: return 0
+        inicio = max(self.inicio.minuto // 60, SLOT_FIRST_HOUR)
+        fim = min(-(-self.fim.minuto // 60), SLOT_FIRST_HOUR + SLOT_HOURS)
+        if fim <= inicio: return 0
+        return ((1 << (fim - inicio)) - 1) << (self.dia.num * SLOT_HOURS + inicio - SLOT_FIRST_HOUR)
+
     def __str__(self) -> str:
         return (f'{self.local} ({self.abbr}) - '
                 f'{self.maximo} - '
@@ -252,6 +276,42 @@ class Oferta:
                 f'Matrícula Especial:\n{self.especial}\n'
                 f'{hs}\n')
 
+# append-only JSONL, one fetched Oferta per line until the save file is rewritten
+class Journal:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = None
+
+    def read(self) -> list[dict[str, Any]]:
+        entries = []
+        valid = 0
+        try:
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # an interrupted run may leave the last line cut short
+                        break
+                    valid += len(line)
+        except FileNotFoundError:
+            return entries
+        os.truncate(self.path, valid)
+        return entries
+
+    def append(self, entry: dict[str, Any]) -> None:
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(entry, separators=(',', ':'), ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def clear(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
 class ConsultaParser(html.parser.HTMLParser):
     def reset(self) -> None:
         super().reset()
@@ -353,6 +413,7 @@ class Sig:
         self._base_url = sig_url
         self._modules = sig_modules
         self._listed_once = False
+        self._last_cod = None
         self._last_url = None
         self._last_csrf = None
         self._consulta_parser = ConsultaParser()
@@ -461,6 +522,108 @@ class Sig:
         self._sig_get('logout')
         return True
 
+def get_ofertas_parallel(sigs: list[Sig], ofertas: list[OfertaHead]) -> Iterator[Oferta]:
+    # one thread per session, results in the order of ofertas; consecutive ofertas of
+    # the same disciplina go to the same session, which then lists them only once
+    groups = [list(g) for _, g in itertools.groupby(ofertas, key=lambda o: o.disc)]
+    free = queue.SimpleQueue()
+    for sig in sigs:
+        free.put(sig)
+    local = threading.local()
+
+    def init():
+        local.sig = free.get()
+
+    def fetch(group: list[OfertaHead]) -> list[Oferta]:
+        return [local.sig.get_oferta(o) for o in group]
+
+    executor = ThreadPoolExecutor(len(sigs), initializer=init)
+    try:
+        for result in executor.map(fetch, groups):
+            yield from result
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+_PACK_DIGITS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+
+def pack_ints(values: list[int]) -> str:
+    # unsigned varints, one url-safe base64 digit per 5 bits, low bits first;
+    # 32 is set on every digit of a number but its last
+    out = []
+    for v in values:
+        if v < 0:
+            raise ValueError(f'pack_ints only takes non-negative values, got {v}')
+        while v >= 32:
+            out.append(_PACK_DIGITS[32 | (v & 31)])
+            v >>= 5
+        out.append(_PACK_DIGITS[v])
+    return ''.join(out)
+
+def _zigzag(v: int) -> int:
+    return v * 2 if v >= 0 else -v * 2 - 1
+
+def _runs(mask: int) -> list[tuple[int, int, int]]:
+    # the slot mask as (dia, hours since SLOT_FIRST_HOUR, length) runs
+    runs = []
+    while mask:
+        start = (mask & -mask).bit_length() - 1
+        x = mask >> start
+        length = ((x + 1) & ~x).bit_length() - 1
+        runs.append((start // SLOT_HOURS, start % SLOT_HOURS, length))
+        mask &= ~(((1 << length) - 1) << start)
+    return runs
+
+def compress_v2(horarios: list[Oferta]) -> dict:
+    # string tables plus one column per field, each packed with pack_ints: 'o*' has one
+    # entry per oferta, 'r*' one per run of the slot mask, 'h*' one per aula; or/oh say
+    # how many runs/aulas each oferta has. Ofertas are sorted by disciplina, so 'd' only
+    # needs how many ofertas each disciplina has. hd is dia + 1, hl is zigzagged
+    tables = {'c': {}, 't': {}, 's': {}, 'k': {}}
+    def index(table: str, v: Any) -> int:
+        return tables[table].setdefault(v, len(tables[table]))
+
+    discs = {}
+    names = ('ot', 'oc', 'on', 'oe', 'or', 'oh', 'rd', 'rh', 'rl', 'hs', 'hk', 'hd', 'hh', 'hm', 'hl')
+    cols = {name: [] for name in names}
+    for oferta in sorted(horarios, key=lambda o: (o.head.disc, o.head.turma)):
+        head = oferta.head
+        if head.disc not in discs:
+            discs[head.disc] = [head.disc, head.nome, 0]
+        discs[head.disc][2] += 1
+        cols['ot'].append(index('t', head.turma))
+        cols['oc'].append(index('c', oferta.curso))
+        # vagas restantes go negative when SIG overbooks
+        cols['on'].append(_zigzag(oferta.normal.vagas_restantes))
+        cols['oe'].append(_zigzag(oferta.especial.vagas_restantes))
+        mask = 0
+        for horario in oferta.horarios:
+            mask |= horario.slots()
+            cols['hs'].append(index('s', (horario.abbr, horario.local)))
+            cols['hk'].append(index('k', horario.tipo))
+            # 0 is "sem horário definido" (dia -1)
+            cols['hd'].append(horario.dia.num + 1)
+            # exact minutes, v1 truncates them to tens
+            cols['hh'].append(horario.inicio.minuto // 60)
+            cols['hm'].append(horario.inicio.minuto % 60)
+            cols['hl'].append(_zigzag(horario.fim.minuto - horario.inicio.minuto))
+        runs = _runs(mask)
+        for dia, hora, length in runs:
+            cols['rd'].append(dia)
+            cols['rh'].append(hora)
+            cols['rl'].append(length)
+        cols['or'].append(len(runs))
+        cols['oh'].append(len(oferta.horarios))
+
+    return {
+        'v': 2,
+        'd': list(discs.values()),
+        'c': list(tables['c']),
+        't': list(tables['t']),
+        's': [list(s) for s in tables['s']],
+        'k': list(tables['k']),
+        **{name: pack_ints(col) for name, col in cols.items()}
+    }
+
 def main(prog: str, argv: list[str]):
     parser = argparse.ArgumentParser(
         prog=prog,
@@ -515,10 +678,19 @@ def main(prog: str, argv: list[str]):
                        help='arquivo com horários',
                        metavar='ARQUIVO',
                        type=argparse.FileType('r', encoding='utf-8'))
+    horas.add_argument('--workers',
+                       help='número de sessões do SIG usadas em paralelo por --buscar-horarios',
+                       metavar='N', type=int, default=1)
     horas.add_argument('--exportar-horarios',
                        help='exportar arquivo para uso na ferramenta web',
                        metavar='ARQUIVO',
                        type=argparse.FileType('w', encoding='utf-8'))
+    horas.add_argument('--versao-exportacao',
+                       help='formato do arquivo exportado (2: colunas e máscaras de horários)',
+                       type=int, choices=[1, 2], default=1)
+    horas.add_argument('--precomprimir',
+                       help='grava também ARQUIVO.gz e/ou ARQUIVO.br do arquivo exportado',
+                       nargs='+', choices=['gzip', 'brotli'], default=[])
 
     args = parser.parse_args(argv)
 
@@ -532,8 +704,15 @@ def main(prog: str, argv: list[str]):
             args.salvar.seek(0)
             json.dump({}, args.salvar)
 
+    def save(data: dict[str, Any]):
+        args.salvar.seek(0)
+        json.dump(data, args.salvar)
+        args.salvar.truncate()
+        args.salvar.flush()
+
     login = args.login or args.arquivo_login
     sig = Sig()
+    sigs = [sig]
     try:
         if login:
             t = args.login if args.login else args.arquivo_login.read()
@@ -544,6 +723,7 @@ def main(prog: str, argv: list[str]):
 
         ofertas: list[OfertaHead] = []
         horarios: list[Oferta] = []
+        journal = None
 
         if args.salvar:
             args.salvar.seek(0)
@@ -554,6 +734,10 @@ def main(prog: str, argv: list[str]):
             if 'horarios' in data:
                 horarios = [Oferta.from_dict(h) for h in data['horarios']]
 
+            # each horário goes here as soon as it is fetched, the save file is
+            # only rewritten once the whole --buscar-horarios run is done
+            journal = Journal(args.salvar.name + '.journal')
+
         if args.buscar_ofertas:
             if not login:
                 print('É necessário se autenticar para realizar busca de ofertas')
@@ -582,65 +766,97 @@ def main(prog: str, argv: list[str]):
             ofertas = sig.get_ofertas(matriz, periodo, disciplina, nome, oferta)
 
             if args.salvar:
-                args.salvar.seek(0)
-                data = json.load(args.salvar)
-
                 data['ofertas'] = [asdict(o) for o in ofertas]
-
-                args.salvar.seek(0)
-                json.dump(data, args.salvar)
+                save(data)
 
         if args.buscar_horarios:
             if args.ofertas:
-                data = json.load(args.ofertas)
-                ofertas = [OfertaHead.from_dict(h) for h in data['ofertas']]
-
-            for i, oferta in enumerate(ofertas):
+                # not data, that one is written back to the save file below
+                entrada = json.load(args.ofertas)
+                ofertas = [OfertaHead.from_dict(h) for h in entrada['ofertas']]
+
+            obtidos = set()
+            if journal:
+                # left by an interrupted run, those are not fetched again
+                for h in journal.read():
+                    oferta_full = Oferta.from_dict(h)
+                    obtidos.add(oferta_full.head.cod)
+                    horarios.append(oferta_full)
+                if obtidos:
+                    print(f'Retomando: {len(obtidos)} horários já obtidos')
+
+            pendentes = [o for o in ofertas if o.cod not in obtidos]
+            if args.workers > 1:
+                # each session has its own parsers and csrf token
+                for _ in range(args.workers - 1):
+                    s = Sig()
+                    if login:
+                        s.login(user, password)
+                    sigs.append(s)
+                obtidas = get_ofertas_parallel(sigs, pendentes)
+            else:
+                obtidas = map(sig.get_oferta, pendentes)
+
+            for i, (oferta, oferta_full) in enumerate(zip(pendentes, obtidas)):
                 if args.salvar:
-                    print(f'Obtendo horário para {oferta} ({i+1}/{len(ofertas)})')
-                oferta_full = sig.get_oferta(oferta)
+                    print(f'Obtido horário para {oferta} ({len(obtidos)+i+1}/{len(obtidos)+len(pendentes)})')
                 if not args.salvar:
                     print(oferta_full)
                 horarios.append(oferta_full)
+                if journal:
+                    journal.append(asdict(oferta_full))
 
             if args.salvar:
-                args.salvar.seek(0)
-                data = json.load(args.salvar)
-
                 data['horarios'] = [asdict(h) for h in horarios]
-
-                args.salvar.seek(0)
-                json.dump(data, args.salvar)
+                save(data)
+                journal.clear()
 
         if args.exportar_horarios:
             if args.horarios:
                 data = json.load(args.horarios)
                 horarios = [Oferta.from_dict(h) for h in data['horarios']]
 
-            c_discs = {}
-            d_turmas = {}
-            d_cursos = {}
-            d_salas = {}
-
-            for oferta in horarios:
-                oferta.compress(c_discs, d_turmas, d_cursos, d_salas)
-
-            c_turmas = [(k, v[1]) for k, v in d_turmas.items()]
-            c_cursos = list(d_cursos.keys())
-            c_salas = [(k, v[1]) for k, v in d_salas.items()]
-            compressed = {
-                'd': c_discs,
-                't': c_turmas,
-                'c': c_cursos,
-                's': c_salas
-            }
-            json.dump(compressed, args.exportar_horarios, separators=(',', ':'))
+            if args.versao_exportacao == 2:
+                compressed = compress_v2(horarios)
+            else:
+                c_discs = {}
+                d_turmas = {}
+                d_cursos = {}
+                d_salas = {}
+
+                for oferta in horarios:
+                    oferta.compress(c_discs, d_turmas, d_cursos, d_salas)
+
+                c_turmas = [(k, v[1]) for k, v in d_turmas.items()]
+                c_cursos = list(d_cursos.keys())
+                c_salas = [(k, v[1]) for k, v in d_salas.items()]
+                compressed = {
+                    'd': c_discs,
+                    't': c_turmas,
+                    'c': c_cursos,
+                    's': c_salas
+                }
+            exported = json.dumps(compressed, separators=(',', ':'))
+            args.exportar_horarios.write(exported)
+
+            for metodo in args.precomprimir:
+                # served as is by the web server, next to the plain file
+                raw = exported.encode('utf-8')
+                if metodo == 'gzip':
+                    with open(args.exportar_horarios.name + '.gz', 'wb') as f:
+                        f.write(gzip.compress(raw, 9))
+                elif brotli is None:
+                    print('É necessário o pacote brotli para --precomprimir brotli')
+                else:
+                    with open(args.exportar_horarios.name + '.br', 'wb') as f:
+                        f.write(brotli.compress(raw, quality=11))
     except:
         traceback.print_exc()
 
     finally:
         if login:
-            sig.logout()
+            for s in sigs:
+                s.logout()
 
 if __name__ == '__main__':
     main(sys.argv[0], sys.argv[1:])
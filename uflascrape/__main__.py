@@ -1,11 +1,15 @@
 from .sig.client import Sig
 import logging
-from .model import dump, Disciplina, Curso, load, Professor, _RefDisciplina
+from .model import Disciplina, Curso, load, Professor, _RefDisciplina, _RefPeriodo
+from .sig.parser import parse_disciplina_pub, parse_oferta, parse_oferta_pub
+from .sig.pool import ParsePool
+from .pipeline import Stage, run_pipeline
+import asyncio
 import json
 from .log import *
 from datetime import timedelta, date
 from itertools import count
-from .sql import build_sql
+from .sql import write_sql
 import dotenv
 import os
 
@@ -13,7 +17,7 @@ dotenv.load()
 
 logger.setLevel(logging.DEBUG)
 logger.addHandler(logging.StreamHandler())
-load(json.load(open('g.json')))
+load(json.load(open('g.json')), trusted=True)
 Curso(cod='G030', sig_cod_int=0, nome='ABI Engenharia')
 Curso(cod='G043', sig_cod_int=0, nome='ABI Educação Física')
 Curso(cod='G055', sig_cod_int=0, nome='ABI Letras')
@@ -28,19 +32,74 @@ try:
     ofertas = sig.list_ofertas()
 
     periodo = '2023/2 - Campus Sede'
-    discis = {}
-    for i, parcial in enumerate(ofertas):
-        print(f'{i+1}/{len(ofertas)} {parcial}')
-        k = _RefDisciplina.r(parcial.disc).key
-        if k not in discis:
-            discis[k] = sig.get_disciplina_pub(parcial.disc, periodo)
-        oferta = sig.get_oferta(parcial)
-        for of in discis[k].ofertas[periodo]:
-            if of.turma == oferta.turma:
-                of.horarios = oferta.horarios
-                of.normal = oferta.normal
-                of.especial = oferta.especial
-                break
+    # SIG keeps the listing state per session, so each fetch worker gets its own
+    n_sessions = 4
+    sessions: asyncio.Queue[Sig] = asyncio.Queue()
+    sessions.put_nowait(sig)
+    for _ in range(n_sessions - 1):
+        s = Sig()
+        s.login(os.getenv('USER'), os.getenv('PASSWORD'))
+        sessions.put_nowait(s)
+
+    # resolved once here, fetch threads must not touch the registry
+    periodo_pub = _RefPeriodo.d(periodo)
+
+    def _fetch_disc(s: Sig, parciais: list[Disciplina.OfertaParcial]):
+        text, pubs = s.fetch_disciplina_pub(parciais[0].disc, periodo_pub)
+        return text, pubs, [s.fetch_oferta(p) for p in parciais]
+
+    async def fetch(parciais: list[Disciplina.OfertaParcial]):
+        s = await sessions.get()
+        try:
+            return await asyncio.to_thread(_fetch_disc, s, parciais)
+        finally:
+            sessions.put_nowait(s)
+
+    pool = ParsePool(4)
+    def _parsed(fn, pages: list[str]):
+        return asyncio.gather(*(asyncio.wrap_future(pool.submit(fn, p)) for p in pages))
+
+    async def parse(item):
+        text, pubs, pages = item
+        return await asyncio.gather(_parsed(parse_disciplina_pub, [text]),
+                                    _parsed(parse_oferta_pub, pubs),
+                                    _parsed(parse_oferta, pages))
+
+    def merge(item):
+        # the only stage that changes the registry
+        (disc,), pubs, parsed = item
+        disc = pool.merge(disc)
+        disc.replace_ofertas(periodo, [pool.merge(p) for p in pubs])
+        for oferta in map(pool.merge, parsed):
+            for of in disc.ofertas[periodo]:
+                if of.turma == oferta.turma:
+                    of.horarios = oferta.horarios
+                    of.normal = oferta.normal
+                    of.especial = oferta.especial
+                    disc.oferta_changed(periodo, of)
+                    break
+        return disc
+
+    with open('d.jsonl', 'w', encoding='utf-8') as out:
+        def export(disc):
+            out.write(disc.model_dump_json() + '\n')
+
+        # one item per disciplina, fetched and merged as a whole
+        grupos: dict[str, list[Disciplina.OfertaParcial]] = {}
+        for parcial in ofertas:
+            grupos.setdefault(_RefDisciplina.r(parcial.disc).key, []).append(parcial)
+        try:
+            run_pipeline(grupos.values(), [
+                Stage('fetch', fetch, workers=n_sessions),
+                Stage('parse', parse, workers=4),
+                Stage('merge', merge),
+                Stage('export', export),
+            ])
+        finally:
+            pool.shutdown()
+            while not sessions.empty():
+                s = sessions.get_nowait()
+                if s is not sig: s.logout()
 
     n_fail = 0
     for i in count():
@@ -58,6 +117,6 @@ finally:
     cursos = list(Curso._values())
     discs = list(Disciplina._values())
     profs = list(Professor._values())
-    s = build_sql(cursos, discs, profs, '2023/2 - Campus Sede')
-    open('d.sql', 'w', encoding='utf-8').write(s)
-    # open('g.json', 'w').write(json.dumps(dump(), indent='\t'))
+    with open('d.sql', 'w', encoding='utf-8') as f:
+        write_sql(f, cursos, discs, profs, '2023/2 - Campus Sede')
+    # with open('g.json', 'w') as f: dump_to(f, indent='\t')
@@ -0,0 +1,96 @@
+from typing import Any, Optional, Sequence
+import os
+
+from .model import RefCurso, RefDisciplina, RefProfessor
+from .sql import RefPeriodos, _sql_rows
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+_FORMATS = ('parquet', 'arrow')
+
+def _schemas() -> dict[str, Any]:
+    # same tables and column order as sql.py; repeated strings are dictionary encoded
+    pa = pyarrow
+    dict_str = pa.dictionary(pa.int32(), pa.string())
+    return {
+        'Cursos': pa.schema([('id_curso', pa.string()), ('nome_curso', pa.string())]),
+        'Disciplinas': pa.schema([('id_disc', pa.string()), ('nome_disc', pa.string()), ('creditos', pa.int16())]),
+        'DisciplinasMatriz': pa.schema([('id_disc', dict_str), ('id_curso', dict_str), ('periodo', pa.int16()), ('cat_eletiva', dict_str)]),
+        'Periodos': pa.schema([('id_periodo', pa.string()), ('sig_cod_int', pa.string())]),
+        'Professores': pa.schema([('id_prof', pa.int64()), ('nome_prof', pa.string()), ('departamento', dict_str)]),
+        'OfertasDisciplina': pa.schema([('id_oferta', pa.int64()), ('id_curso', dict_str), ('id_disc', dict_str), ('id_periodo', dict_str),
+                                        ('turma', dict_str), ('vagas_restantes', pa.int32()), ('vagas_ocupadas', pa.int32())]),
+        'Locais': pa.schema([('id_local', pa.string()), ('nome', pa.string()), ('ocupacao', pa.int32())]),
+        'Aulas': pa.schema([('id_oferta', pa.int64()), ('nome_local', dict_str), ('dia_semana', dict_str), ('hora_inicio', pa.int8()), ('hora_fim', pa.int8())]),
+        'Leciona': pa.schema([('id_prof', pa.int64()), ('id_oferta', pa.int64()), ('eh_principal', pa.int8())]),
+    }
+
+class _TableWriter:
+    def __init__(self, path: str, schema: Any, format: str, row_group: int, compression: Optional[str]):
+        self.path = path
+        self.schema = schema
+        self.format = format
+        self.row_group = row_group
+        self.compression = compression
+        self.columns: list[list[Any]] = [[] for _ in schema]
+        self.writer: Any = None
+
+    def append(self, row: tuple[Any, ...]) -> None:
+        for col, v in zip(self.columns, row):
+            col.append(v)
+        if len(self.columns[0]) >= self.row_group:
+            self.flush()
+
+    def _open(self) -> Any:
+        if self.format == 'parquet':
+            return pyarrow.parquet.ParquetWriter(self.path, self.schema, compression=self.compression or 'none')
+        # the stream format, the file one cannot change dictionaries between batches
+        options = pyarrow.ipc.IpcWriteOptions(compression=self.compression)
+        return pyarrow.ipc.new_stream(self.path, self.schema, options=options)
+
+    def flush(self) -> None:
+        # one row group (parquet) or record batch (arrow) per flush
+        if self.writer is None:
+            self.writer = self._open()
+        if not self.columns[0]: return
+        arrays = [pyarrow.array(col, type=field.type) for col, field in zip(self.columns, self.schema)]
+        self.writer.write_table(pyarrow.Table.from_arrays(arrays, schema=self.schema))
+        self.columns = [[] for _ in self.schema]
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+def write_columnar(path: str,
+                   cursos: Sequence[RefCurso],
+                   disciplinas: Sequence[RefDisciplina],
+                   professores: Sequence[RefProfessor],
+                   periodo: RefPeriodos = None,
+                   format: str = 'parquet',
+                   row_group: int = 65536,
+                   compression: Optional[str] = 'zstd') -> None:
+    # one {table}.parquet or {table}.arrow per table in the directory path
+    if pyarrow is None:
+        raise RuntimeError('columnar export requires the pyarrow package')
+    if format not in _FORMATS:
+        raise ValueError(f'Unknown format {format} (must be one of {_FORMATS})')
+    os.makedirs(path, exist_ok=True)
+    writers = {table: _TableWriter(os.path.join(path, f'{table}.{format}'), schema, format, row_group, compression)
+               for table, schema in _schemas().items()}
+    try:
+        for table, row in _sql_rows(cursos, disciplinas, professores, periodo):
+            writers[table].append(row)
+        for w in writers.values():
+            w.flush()
+    finally:
+        for w in writers.values():
+            w.close()
+
+__all__ = [
+    "write_columnar",
+]
@@ -0,0 +1,349 @@
+from pydantic import BaseModel, AfterValidator
+from typing import Any, Optional, BinaryIO, Annotated, Callable, Union, get_args, get_origin, get_type_hints
+from types import UnionType
+from array import array
+from itertools import accumulate
+from datetime import date
+import gzip
+import json
+import math
+import struct
+import sys
+
+from . import model
+from .model import Ref, Disciplina
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b'UFSC'
+VERSION = 1
+
+_COMPRESSIONS = {None: 0, 'gzip': 1, 'zstd': 2}
+_INT_NONE = -2**63
+
+Horario = Disciplina.Oferta.HorarioLocal.Horario
+Columns = dict[str, array]
+
+class _Encoder:
+    def __init__(self):
+        self.cols: Columns = {}
+        self.strings: dict[str, int] = {}
+
+    def string(self, s: Optional[str]) -> int:
+        if s is None: return -1
+        i = self.strings.get(s)
+        if i is None:
+            i = self.strings[s] = len(self.strings)
+        return i
+
+class _Decoder:
+    def __init__(self, cols: Columns, strings: list[Optional[str]], models: bool):
+        self.cols = cols
+        self.strings = strings
+        # build models directly instead of dump() dicts
+        self.models = models
+        self.refs: dict[type[Ref], list[Optional[Ref]]] = {}
+
+    def ref(self, cls: type[Ref], i: int) -> Optional[Ref]:
+        # one shared ref per key, like model.load(trusted=True)
+        refs = self.refs.get(cls)
+        if refs is None:
+            refs = self.refs[cls] = [None] * len(self.strings)
+        r = refs[i]
+        if r is None:
+            r = refs[i] = model._new(cls, {'root': self.strings[i]})
+        return r
+
+def _int_array(values: list[int]) -> array:
+    lo, hi = (min(values), max(values)) if values else (0, 0)
+    for typecode in 'bhiq':
+        a = array(typecode)
+        bits = a.itemsize * 8 - 1
+        if -2**bits <= lo and hi < 2**bits:
+            a.fromlist(values)
+            return a
+    raise OverflowError(f'Integer column out of range ({lo}, {hi})')
+
+class _Codec:
+    def encode(self, values: list[Any], path: str, enc: _Encoder) -> None: ...
+    def decode(self, n: int, path: str, dec: _Decoder) -> list[Any]: ...
+
+class _Str(_Codec):
+    def encode(self, values, path, enc):
+        enc.cols[path] = _int_array([enc.string(v) for v in values])
+
+    def decode(self, n, path, dec):
+        # strings[-1] is None
+        strings = dec.strings
+        return [strings[i] for i in dec.cols[path]]
+
+class _Date(_Str):
+    def decode(self, n, path, dec):
+        values = super().decode(n, path, dec)
+        if not dec.models: return values
+        return [date.fromisoformat(v) for v in values]
+
+class _Ref(_Str):
+    def __init__(self, cls: type[Ref]):
+        self.cls = cls
+
+    def decode(self, n, path, dec):
+        if not dec.models: return super().decode(n, path, dec)
+        cls = self.cls
+        return [None if i < 0 else dec.ref(cls, i) for i in dec.cols[path]]
+
+class _Int(_Codec):
+    def encode(self, values, path, enc):
+        enc.cols[path] = _int_array([_INT_NONE if v is None else v for v in values])
+
+    def decode(self, n, path, dec):
+        col = dec.cols[path].tolist()
+        if col and min(col) == _INT_NONE:
+            return [None if v == _INT_NONE else v for v in col]
+        return col
+
+class _Float(_Codec):
+    def encode(self, values, path, enc):
+        enc.cols[path] = array('d', [math.nan if v is None else v for v in values])
+
+    def decode(self, n, path, dec):
+        return [None if v != v else v for v in dec.cols[path]]
+
+class _Horario(_Codec):
+    # hora in [-1, 23] and minuto in [-1, 59] packed into one small int
+    def encode(self, values, path, enc):
+        enc.cols[path] = _int_array([(v['hora'] + 1) * 61 + v['minuto'] + 1 for v in values])
+
+    def decode(self, n, path, dec):
+        values = [{'hora': p // 61 - 1, 'minuto': p % 61 - 1} for p in dec.cols[path]]
+        if not dec.models: return values
+        return [model._new(Horario, v) for v in values]
+
+class _Model(_Codec):
+    def __init__(self, cls: type[BaseModel]):
+        self.cls = cls
+        self.fields: list[tuple[str, _Codec]] = []
+
+    def encode(self, values, path, enc):
+        for name, codec in self.fields:
+            codec.encode([v[name] for v in values], f'{path}.{name}', enc)
+
+    def decode(self, n, path, dec):
+        names = [name for name, _ in self.fields]
+        fields = [codec.decode(n, f'{path}.{name}', dec) for name, codec in self.fields]
+        rows = [dict(zip(names, row)) for row in zip(*fields)]
+        if not dec.models: return rows
+        cls = self.cls
+        return [model._new(cls, row) for row in rows]
+
+class _After(_Codec):
+    # AfterValidators of Annotated fields, e.g. model._shared, run on decoded models
+    def __init__(self, inner: _Codec, funcs: list[Callable[[Any], Any]]):
+        self.inner = inner
+        self.funcs = funcs
+
+    def encode(self, values, path, enc):
+        self.inner.encode(values, path, enc)
+
+    def decode(self, n, path, dec):
+        values = self.inner.decode(n, path, dec)
+        if not dec.models: return values
+        for f in self.funcs:
+            values = [f(v) for v in values]
+        return values
+
+class _Optional(_Codec):
+    def __init__(self, inner: _Codec):
+        self.inner = inner
+
+    def encode(self, values, path, enc):
+        present = [v for v in values if v is not None]
+        enc.cols[f'{path}?'] = array('b', [v is not None for v in values])
+        self.inner.encode(present, path, enc)
+
+    def decode(self, n, path, dec):
+        mask = dec.cols[f'{path}?']
+        it = iter(self.inner.decode(sum(mask), path, dec))
+        return [next(it) if m else None for m in mask]
+
+def _split(flat: list[Any], counts: array) -> list[list[Any]]:
+    offsets = list(accumulate(counts, initial=0))
+    return [flat[a:b] for a, b in zip(offsets, offsets[1:])]
+
+class _List(_Codec):
+    def __init__(self, inner: _Codec):
+        self.inner = inner
+
+    def encode(self, values, path, enc):
+        enc.cols[f'{path}#'] = _int_array([len(v) for v in values])
+        self.inner.encode([x for v in values for x in v], f'{path}[]', enc)
+
+    def decode(self, n, path, dec):
+        counts = dec.cols[f'{path}#']
+        return _split(self.inner.decode(sum(counts), f'{path}[]', dec), counts)
+
+class _Dict(_Codec):
+    def __init__(self, key: _Codec, value: _Codec):
+        self.key = key
+        self.value = value
+
+    def encode(self, values, path, enc):
+        enc.cols[f'{path}#'] = _int_array([len(v) for v in values])
+        self.key.encode([k for v in values for k in v], f'{path}.k', enc)
+        self.value.encode([x for v in values for x in v.values()], f'{path}.v', enc)
+
+    def decode(self, n, path, dec):
+        counts = dec.cols[f'{path}#']
+        total = sum(counts)
+        keys = _split(self.key.decode(total, f'{path}.k', dec), counts)
+        values = _split(self.value.decode(total, f'{path}.v', dec), counts)
+        return [dict(zip(k, v)) for k, v in zip(keys, values)]
+
+_codecs: dict[type, _Codec] = {}
+
+def _codec(tp: Any) -> _Codec:
+    origin = get_origin(tp)
+    if origin is Annotated:
+        for meta in tp.__metadata__:
+            ref = getattr(getattr(meta, 'func', None), '__self__', None)
+            if isinstance(ref, type) and issubclass(ref, Ref):
+                # refs are dumped as their key
+                return _Ref(ref)
+        inner = _codec(get_args(tp)[0])
+        funcs = [meta.func for meta in tp.__metadata__ if isinstance(meta, AfterValidator)]
+        # the string table already shares every decoded string
+        if not funcs or isinstance(inner, (_Str, _Int, _Float)): return inner
+        return _After(inner, funcs)
+    if origin is Union or origin is UnionType:
+        args = [a for a in get_args(tp) if a is not type(None)]
+        inner = _codec(args[0])
+        if isinstance(inner, (_Str, _Int, _Float)): return inner
+        return _Optional(inner)
+    if origin is list:
+        return _List(_codec(get_args(tp)[0]))
+    if origin is dict:
+        k, v = get_args(tp)
+        return _Dict(_codec(k), _codec(v))
+    if tp is Horario:
+        return _Horario()
+    if tp is date:
+        return _Date()
+    if tp is str:
+        return _Str()
+    if tp is int:
+        return _Int()
+    if tp is float:
+        return _Float()
+    if isinstance(tp, type) and issubclass(tp, BaseModel):
+        if tp not in _codecs:
+            codec = _codecs[tp] = _Model(tp)
+            hints = get_type_hints(tp, vars(model), include_extras=True)
+            codec.fields = [(name, _codec(hints[name])) for name in tp.model_fields]
+        return _codecs[tp]
+    raise TypeError(f'Cannot encode {tp}')
+
+def _column_bytes(a: array) -> bytes:
+    if sys.byteorder == 'big':
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes()
+
+def _column_from_bytes(typecode: str, b: bytes) -> array:
+    a = array(typecode)
+    a.frombytes(b)
+    if sys.byteorder == 'big':
+        a.byteswap()
+    return a
+
+def encode(data: dict[str, Any]) -> bytes:
+    enc = _Encoder()
+    sections = {}
+    for name, cls in model._load_order:
+        sections[name] = len(data[name])
+        _codec(cls).encode(data[name], name, enc)
+
+    table = list(enc.strings)
+    enc.cols['$len'] = _int_array([len(s) for s in table])
+    blobs = [('$str', 'B', ''.join(table).encode('utf-8'))]
+    blobs += [(path, a.typecode, _column_bytes(a)) for path, a in enc.cols.items()]
+
+    header = json.dumps({
+        'sections': sections,
+        'columns': [[path, typecode, len(b)] for path, typecode, b in blobs],
+    }, separators=(',', ':')).encode('utf-8')
+    return b''.join([struct.pack('<I', len(header)), header] + [b for _, _, b in blobs])
+
+def _decode(buf: bytes, models: bool) -> dict[str, list[Any]]:
+    mv = memoryview(buf)
+    (header_len,) = struct.unpack_from('<I', mv)
+    header = json.loads(bytes(mv[4:4 + header_len]))
+    offset = 4 + header_len
+    cols: Columns = {}
+    blob = b''
+    for path, typecode, size in header['columns']:
+        if path == '$str':
+            blob = bytes(mv[offset:offset + size])
+        else:
+            cols[path] = _column_from_bytes(typecode, mv[offset:offset + size])
+        offset += size
+
+    text = blob.decode('utf-8')
+    offsets = list(accumulate(cols['$len'], initial=0))
+    strings: list[Optional[str]] = [text[a:b] for a, b in zip(offsets, offsets[1:])]
+    strings.append(None)
+
+    dec = _Decoder(cols, strings, models)
+    return {
+        name: _codec(cls).decode(header['sections'][name], name, dec)
+        for name, cls in model._load_order
+    }
+
+def decode(buf: bytes) -> dict[str, Any]:
+    return _decode(buf, models=False)
+
+def compress(raw: bytes, compression: Optional[str] = None) -> bytes:
+    if compression not in _COMPRESSIONS:
+        raise ValueError(f'Unknown compression {compression}')
+    if compression == 'gzip':
+        raw = gzip.compress(raw, compresslevel=6)
+    elif compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('zstd compression requires the zstandard package')
+        raw = zstandard.ZstdCompressor(level=10).compress(raw)
+    return MAGIC + bytes([VERSION, _COMPRESSIONS[compression]]) + raw
+
+def decompress(buf: bytes) -> bytes:
+    if buf[:4] != MAGIC:
+        raise ValueError('Not a uflascrape snapshot')
+    if buf[4] != VERSION:
+        raise ValueError(f'Unsupported snapshot version {buf[4]}')
+    compression = buf[5]
+    raw = buf[6:]
+    if compression == _COMPRESSIONS['gzip']:
+        return gzip.decompress(raw)
+    if compression == _COMPRESSIONS['zstd']:
+        if zstandard is None:
+            raise RuntimeError('zstd compression requires the zstandard package')
+        return zstandard.ZstdDecompressor().decompress(raw)
+    return raw
+
+def dump(fp: BinaryIO, compression: Optional[str] = None) -> None:
+    fp.write(compress(encode(model.dump()), compression))
+
+def load(fp: BinaryIO) -> None:
+    buf = decompress(fp.read())
+    with model._loading():
+        data = _decode(buf, models=True)
+        for name, cls in model._load_order:
+            for inst in data[name]:
+                cls._register(inst)
+
+__all__ = [
+    "encode",
+    "decode",
+    "dump",
+    "load",
+]
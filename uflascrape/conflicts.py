@@ -0,0 +1,45 @@
+from typing import Sequence
+
+from .model import Disciplina, RefPeriodo, SLOT_DAYS, SLOT_HOURS, _bits
+from .query import Hit, index
+
+Oferta = Disciplina.Oferta
+N_SLOTS = SLOT_DAYS * SLOT_HOURS
+
+def conflicts(a: Oferta, b: Oferta) -> bool:
+    return a.slots & b.slots != 0
+
+def conflict_matrix(ofertas: Sequence[Oferta]) -> list[int]:
+    # row i has bit j set when ofertas i and j share a slot
+    n = len(ofertas)
+    masks = [o.slots for o in ofertas]
+
+    # transpose: for each slot, which ofertas use it, built as one bitmap per slot
+    columns = [bytearray((n + 7) // 8) for _ in range(N_SLOTS)]
+    for i, m in enumerate(masks):
+        byte, bit = i >> 3, 1 << (i & 7)
+        for s in _bits(m):
+            columns[s][byte] |= bit
+    by_slot = [int.from_bytes(c, 'little') for c in columns]
+
+    rows = []
+    for i, m in enumerate(masks):
+        row = 0
+        for s in _bits(m):
+            row |= by_slot[s]
+        rows.append(row & ~(1 << i))
+    return rows
+
+def conflict_pairs(rows: Sequence[int]) -> list[tuple[int, int]]:
+    return [(i, j) for i, row in enumerate(rows) for j in _bits(row >> (i + 1) << (i + 1))]
+
+def periodo_conflicts(periodo: RefPeriodo) -> tuple[list[Hit], list[int]]:
+    hits = index().by_periodo(periodo)
+    return hits, conflict_matrix([hit.oferta for hit in hits])
+
+__all__ = [
+    "conflicts",
+    "conflict_matrix",
+    "conflict_pairs",
+    "periodo_conflicts",
+]
@@ -0,0 +1,118 @@
+from typing import Any, Iterable, Mapping, NamedTuple, Optional, Generator
+
+from .model import _load_order
+
+Entity = dict[str, Any]
+Snapshot = Mapping[str, Iterable[Entity]]
+
+# field used to match entities of each section between snapshots
+KEYS = {
+    'cursos': 'cod',
+    'locais': 'abbr',
+    'professores': 'nome',
+    'disciplinas': 'cod',
+    'periodos': 'nome',
+    'cardapios': 'data',
+}
+
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+TURMA_ADDED = 'turma_added'
+TURMA_REMOVED = 'turma_removed'
+HORARIO = 'horario'
+LOCAL = 'local'
+PROFESSOR = 'professor'
+VAGAS = 'vagas'
+
+_PROFESSORES = ('professor_principal', 'professores_alocados', 'professores_visitantes')
+_VAGAS = ('normal', 'especial')
+
+class Change(NamedTuple):
+    kind: str
+    section: str
+    key: Any
+    periodo: Optional[str] = None
+    turma: Optional[str] = None
+    field: Optional[str] = None
+    old: Any = None
+    new: Any = None
+
+def _union(a: Iterable[Any], b: Iterable[Any]) -> list[Any]:
+    # keys of a then the new ones of b, in a stable order
+    keys = list(a)
+    seen = set(keys)
+    return keys + [k for k in b if k not in seen]
+
+def registry() -> dict[str, Generator[Entity, None, None]]:
+    # the live registry in snapshot form, one entity at a time
+    def section(cls: type) -> Generator[Entity, None, None]:
+        for inst in cls._values():
+            yield inst.model_dump(mode='json')
+    return {name: section(cls) for name, cls in _load_order}
+
+def _fields(section: str, key: Any, old: Entity, new: Entity, skip: tuple[str, ...] = ()) -> Generator[Change, None, None]:
+    for f in _union(old, new):
+        if f in skip: continue
+        a, b = old.get(f), new.get(f)
+        if a != b:
+            yield Change(CHANGED, section, key, field=f, old=a, new=b)
+
+def _oferta(key: str, periodo: str, old: Entity, new: Entity) -> Generator[Change, None, None]:
+    turma = new['turma']
+    a, b = old.get('horarios', []), new.get('horarios', [])
+    if a != b:
+        locais_a = [h['local'] for h in a]
+        locais_b = [h['local'] for h in b]
+        tempos_a = [(h['dia'], h['inicio'], h['fim']) for h in a]
+        tempos_b = [(h['dia'], h['inicio'], h['fim']) for h in b]
+        if tempos_a != tempos_b:
+            yield Change(HORARIO, 'disciplinas', key, periodo, turma, 'horarios', a, b)
+        if locais_a != locais_b:
+            yield Change(LOCAL, 'disciplinas', key, periodo, turma, 'horarios', locais_a, locais_b)
+    for f in _PROFESSORES:
+        if old.get(f) != new.get(f):
+            yield Change(PROFESSOR, 'disciplinas', key, periodo, turma, f, old.get(f), new.get(f))
+    for f in _VAGAS:
+        if old.get(f) != new.get(f):
+            yield Change(VAGAS, 'disciplinas', key, periodo, turma, f, old.get(f), new.get(f))
+    for c in _fields('disciplinas', key, old, new, ('horarios', 'turma') + _PROFESSORES + _VAGAS):
+        yield c._replace(periodo=periodo, turma=turma)
+
+def _disciplina(key: str, old: Entity, new: Entity) -> Generator[Change, None, None]:
+    yield from _fields('disciplinas', key, old, new, ('ofertas',))
+    ofertas_a, ofertas_b = old.get('ofertas', {}), new.get('ofertas', {})
+    for periodo in _union(ofertas_a, ofertas_b):
+        a = {o['turma']: o for o in ofertas_a.get(periodo, [])}
+        for o in ofertas_b.get(periodo, []):
+            prev = a.pop(o['turma'], None)
+            if prev is None:
+                yield Change(TURMA_ADDED, 'disciplinas', key, periodo, o['turma'], new=o)
+            elif prev != o:
+                yield from _oferta(key, periodo, prev, o)
+        for turma, o in a.items():
+            yield Change(TURMA_REMOVED, 'disciplinas', key, periodo, turma, old=o)
+
+def diff(old: Snapshot, new: Snapshot) -> Generator[Change, None, None]:
+    # entities are matched by key; only the ones that differ are walked field by field
+    for section, k in KEYS.items():
+        before: dict[Any, Entity] = {e[k]: e for e in old.get(section, [])}
+        for e in new.get(section, []):
+            key = e[k]
+            prev = before.pop(key, None)
+            if prev is None:
+                yield Change(ADDED, section, key, new=e)
+                continue
+            if prev == e: continue
+            if section == 'disciplinas':
+                yield from _disciplina(key, prev, e)
+            else:
+                yield from _fields(section, key, prev, e)
+        for key, e in before.items():
+            yield Change(REMOVED, section, key, old=e)
+
+__all__ = [
+    "Change",
+    "diff",
+    "registry",
+]
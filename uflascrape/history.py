@@ -0,0 +1,179 @@
+from typing import Optional, Iterable
+from array import array
+import bisect
+import json
+import mmap
+import os
+import sys
+import time
+
+from .model import Disciplina, RefDisciplina, RefPeriodo, RefCurso, _RefDisciplina, _RefPeriodo, _RefCurso
+
+Oferta = Disciplina.Oferta
+
+# one record per sample: timestamp, oferecidas, ocupadas, restantes, pendentes
+FIELDS = ('timestamp', 'oferecidas', 'ocupadas', 'restantes', 'pendentes')
+TIMESTAMP, OFERECIDAS, OCUPADAS, RESTANTES, PENDENTES = range(len(FIELDS))
+RECORD = len(FIELDS)
+# int64, epoch seconds do not fit int32 past 2038
+_TYPECODE = 'q'
+_ITEMSIZE = array(_TYPECODE).itemsize
+# one series per line, appended as they appear
+_CATALOG = 'catalog.jsonl'
+
+class Series:
+    def __init__(self, path: str):
+        self.path = path
+
+    def view(self) -> memoryview:
+        # flat int64 records, RECORD ints each; valid until the next append
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(array(_TYPECODE))
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(mm).cast(_TYPECODE)
+
+    def __len__(self) -> int:
+        return os.path.getsize(self.path) // (_ITEMSIZE * RECORD)
+
+    def range(self, inicio: int, fim: int) -> memoryview:
+        view = self.view()
+        timestamps = view[TIMESTAMP::RECORD]
+        a = bisect.bisect_left(timestamps, inicio)
+        b = bisect.bisect_left(timestamps, fim)
+        return view[a * RECORD:b * RECORD]
+
+    def last(self) -> Optional[tuple[int, ...]]:
+        n = len(self)
+        if n == 0: return None
+        with open(self.path, 'rb') as f:
+            f.seek((n - 1) * RECORD * _ITEMSIZE)
+            a = array(_TYPECODE)
+            a.frombytes(f.read(RECORD * _ITEMSIZE))
+        if sys.byteorder == 'big':
+            a.byteswap()
+        return tuple(a)
+
+class VagasHistory:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._catalog: dict[str, dict[str, str]] = {}
+        catalog = os.path.join(path, _CATALOG)
+        if os.path.exists(catalog):
+            with open(catalog, 'rb+') as f:
+                data = f.read()
+                # a line torn by a crash is dropped, the next append starts clean
+                end = data.rfind(b'\n') + 1
+                if end != len(data):
+                    f.truncate(end)
+            for line in data[:end].splitlines():
+                s = json.loads(line)
+                self._catalog[s.pop('id')] = s
+        self._ids = {(s['periodo'], s['disciplina'], s['turma']): i for i, s in self._catalog.items()}
+        self._last: dict[str, Optional[tuple[int, ...]]] = {}
+
+    def _append_catalog(self, i: str) -> None:
+        with open(os.path.join(self.path, _CATALOG), 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'id': i, **self._catalog[i]}, ensure_ascii=False) + '\n')
+
+    def _series_id(self, disciplina: str, periodo: str, oferta: Oferta) -> str:
+        key = (periodo, disciplina, oferta.turma)
+        i = self._ids.get(key)
+        if i is None:
+            i = self._ids[key] = str(len(self._ids))
+            self._catalog[i] = {
+                'periodo': periodo,
+                'disciplina': disciplina,
+                'turma': oferta.turma,
+                'curso': _RefCurso.r(oferta.curso).key,
+            }
+            self._append_catalog(i)
+        return i
+
+    def _file(self, i: str) -> str:
+        return os.path.join(self.path, f'{i}.bin')
+
+    def series(self, disciplina: RefDisciplina, periodo: RefPeriodo, turma: str) -> Optional[Series]:
+        key = (_RefPeriodo.r(periodo).key, _RefDisciplina.r(disciplina).key, turma)
+        i = self._ids.get(key)
+        if i is None: return None
+        return Series(self._file(i))
+
+    def record(self, disciplina: RefDisciplina, periodo: RefPeriodo, oferta: Oferta, timestamp: Optional[int] = None) -> bool:
+        vagas = oferta.normal
+        if vagas is None: return False
+        i = self._series_id(_RefDisciplina.r(disciplina).key, _RefPeriodo.r(periodo).key, oferta)
+        if i not in self._last:
+            self._last[i] = Series(self._file(i)).last() if os.path.exists(self._file(i)) else None
+        last = self._last[i]
+        values = (vagas.oferecidas, vagas.ocupadas, vagas.restantes, vagas.pendentes)
+        # only changes are stored; the previous sample holds until then
+        if last is not None and last[1:] == values: return False
+
+        ts = int(time.time()) if timestamp is None else timestamp
+        rec = array(_TYPECODE, (ts, *values))
+        if sys.byteorder == 'big':
+            rec.byteswap()
+        with open(self._file(i), 'ab') as f:
+            f.write(rec.tobytes())
+        self._last[i] = (ts, *values)
+        return True
+
+    def record_all(self, periodo: RefPeriodo, timestamp: Optional[int] = None) -> int:
+        p = _RefPeriodo.r(periodo).key
+        ts = int(time.time()) if timestamp is None else timestamp
+        n = 0
+        for disc in Disciplina._values():
+            for oferta in disc.ofertas.get(p, []):
+                n += self.record(disc, p, oferta, ts)
+        return n
+
+    def _select(self, periodo: str, curso: Optional[str], disciplina: Optional[str]) -> Iterable[str]:
+        for i, s in self._catalog.items():
+            if s['periodo'] != periodo: continue
+            if curso is not None and s['curso'] != curso: continue
+            if disciplina is not None and s['disciplina'] != disciplina: continue
+            yield i
+
+    def fill_rate(self,
+                  periodo: RefPeriodo,
+                  inicio: int,
+                  fim: int,
+                  passo: int,
+                  curso: Optional[RefCurso] = None,
+                  disciplina: Optional[RefDisciplina] = None) -> list[tuple[int, float]]:
+        p = _RefPeriodo.r(periodo).key
+        c = _RefCurso.r(curso).key if curso is not None else None
+        d = _RefDisciplina.r(disciplina).key if disciplina is not None else None
+        n = len(range(inicio, fim, passo))
+        # per-bucket deltas, summed once at the end: cost is per sample, not per bucket
+        ocupadas = array('q', [0]) * (n + 1)
+        oferecidas = array('q', [0]) * (n + 1)
+
+        for i in self._select(p, c, d):
+            view = Series(self._file(i)).view()
+            # samples older than the last one before inicio are overridden anyway
+            start = max(0, bisect.bisect_right(view[TIMESTAMP::RECORD], inicio) - 1)
+            prev_ocupadas = prev_oferecidas = 0
+            for base in range(start * RECORD, len(view), RECORD):
+                # a sample counts from the first bucket at or after it
+                k = max(0, -((inicio - view[base + TIMESTAMP]) // passo))
+                if k >= n: break
+                o, of = view[base + OCUPADAS], view[base + OFERECIDAS]
+                ocupadas[k] += o - prev_ocupadas
+                oferecidas[k] += of - prev_oferecidas
+                prev_ocupadas, prev_oferecidas = o, of
+
+        rates = []
+        o = of = 0
+        for k, t in enumerate(range(inicio, fim, passo)):
+            o += ocupadas[k]
+            of += oferecidas[k]
+            rates.append((t, o / of if of else 0.0))
+        return rates
+
+__all__ = [
+    "Series",
+    "VagasHistory",
+]
@@ -1,13 +1,43 @@
-from pydantic import BaseModel, Field, model_serializer, field_serializer, RootModel, BeforeValidator
-from typing import Optional, Any, Generic, Generator, TypeVar, cast, Self, Iterable, Annotated, ClassVar
+from pydantic import BaseModel, ConfigDict, Field, model_serializer, field_serializer, RootModel, BeforeValidator, AfterValidator
+from typing import Optional, Any, Generic, Generator, TypeVar, cast, Self, Iterable, Annotated, ClassVar, Callable, Union, TextIO, get_args, get_origin, get_type_hints
+from types import UnionType
 from collections import defaultdict
 from datetime import date
+from functools import cached_property
+from contextlib import contextmanager
 
 from .log import *
 import abc
+import gc
+import json
+import sys
+import weakref
 
 _refs = defaultdict(dict)
 
+# frozen value objects are shared, one instance per distinct value; held weakly,
+# so values no model uses anymore (e.g. after _refs.clear()) are dropped
+_flyweights: defaultdict[type, weakref.WeakValueDictionary[tuple, Any]] = defaultdict(weakref.WeakValueDictionary)
+
+def _shared(v: Any) -> Any:
+    return _flyweights[type(v)].setdefault(tuple(v.__dict__.values()), v)
+
+def _intern(v: str) -> str:
+    return sys.intern(v)
+
+# strings repeated across many entities (turma, situação, departamento, ...)
+Interned = Annotated[str, AfterValidator(_intern)]
+
+# entities missing from the registry are fetched from a Source on first access
+class Source(abc.ABC):
+    @abc.abstractmethod
+    def fetch(self, cls: type['RefBy'], k: Any) -> Optional['RefBy']: ...
+
+    @abc.abstractmethod
+    def fetch_all(self, cls: type['RefBy']) -> None: ...
+
+_sources: dict[type, Source] = {}
+
 K = TypeVar('K')
 class RefBy(BaseModel, abc.ABC, Generic[K]):
     _key_type: ClassVar[type]
@@ -25,12 +55,7 @@ class RefBy(BaseModel, abc.ABC, Generic[K]):
     def __new__(cls, **data: Any) -> Self:
         inst = super().__new__(cls)
         inst.__init__(_init=True, **data)
-        k = inst.key
-
-        if k not in _refs[cls]:
-            _refs[cls][k] = inst
-        _refs[cls][k]._merge(inst)
-        return _refs[cls][k]
+        return cls._register(inst)
 
     def __init__(self, **data: Any):
         if '_init' not in data: return
@@ -38,13 +63,31 @@ class RefBy(BaseModel, abc.ABC, Generic[K]):
         super().__init__(**data)
         self._init = True
 
+    @classmethod
+    def _register(cls, inst: Self) -> Self:
+        k = inst.key
+        existing = cls._get(k)
+        if existing is None:
+            _refs[cls][k] = inst
+            inst._registered()
+            return inst
+        existing._merge(inst)
+        return existing
+
+    def _registered(self) -> None: ...
+
     @classmethod
     def _values(cls) -> Iterable[Self]:
+        if cls in _sources:
+            _sources[cls].fetch_all(cls)
         return _refs[cls].values()
 
     @classmethod
     def _get(cls, k: K) -> Optional[Self]:
-        return _refs[cls].get(k)
+        r = _refs[cls].get(k)
+        if r is None and cls in _sources:
+            r = cast(Optional[Self], _sources[cls].fetch(cls, k))
+        return r
 
 RefByK = TypeVar('RefByK', bound=RefBy)
 class Ref(RootModel[K | RefByK], Generic[K, RefByK]):
@@ -65,6 +108,7 @@ class Ref(RootModel[K | RefByK], Generic[K, RefByK]):
     @classmethod
     def r(cls, v: K | RefByK | Self) -> Self:
         if isinstance(v, cls): return v
+        if isinstance(v, str): v = sys.intern(v)
         return cls(v)
 
     @classmethod
@@ -182,7 +226,7 @@ class Professor(RefBy[str]):
 
     nome: str
     """Nome do professor"""
-    departamento: str
+    departamento: Interned
 
     def _get_key(self) -> str:
         return self.nome
@@ -237,16 +281,29 @@ class Periodo(RefBy[str]):
     
     def _merge(self, other: Self): ...
 
+# weekly slot bitmasks: bit dia * SLOT_HOURS + (hora - SLOT_FIRST_HOUR)
+SLOT_FIRST_HOUR = 7
+SLOT_HOURS = 16
+SLOT_DAYS = 7
+
+def _bits(mask: int) -> Iterable[int]:
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
 class Disciplina(RefBy[str]):
     _key_type = str
 
     class OfertaParcial(BaseModel):
         disc: 'RefDisciplina'
-        turma: str
+        turma: Interned
         sig_cod_int: int
 
     class Oferta(BaseModel):
         class Vagas(BaseModel):
+            model_config = ConfigDict(frozen=True)
+
             oferecidas: int
             """Quantidade de vagas oferecidas"""
             ocupadas: int
@@ -258,6 +315,8 @@ class Disciplina(RefBy[str]):
 
         class HorarioLocal(BaseModel):
             class Horario(BaseModel):
+                model_config = ConfigDict(frozen=True)
+
                 hora: int
                 """Hora do dia"""
                 minuto: int
@@ -271,32 +330,53 @@ class Disciplina(RefBy[str]):
 
             dia: int
             """Dia da semana (0 - domingo, 1 - segunda, ..., 6 - sábado)"""
-            inicio: Horario
+            inicio: Annotated[Horario, AfterValidator(_shared)]
             """Horário de início da aula"""
-            fim: Horario
+            fim: Annotated[Horario, AfterValidator(_shared)]
             """Horário de fim da aula"""
             local: 'RefLocal'
             """Local da aula"""
 
-        situacao: str
-        turma: str
+            def horas(self) -> range:
+                fim = self.fim.hora + (1 if self.fim.minuto > 0 else 0)
+                return range(self.inicio.hora, max(fim, self.inicio.hora + 1))
+
+            @property
+            def slots(self) -> int:
+                if not 0 <= self.dia < SLOT_DAYS: return 0
+                horas = self.horas()
+                inicio = max(horas.start, SLOT_FIRST_HOUR)
+                fim = min(horas.stop, SLOT_FIRST_HOUR + SLOT_HOURS)
+                if fim <= inicio: return 0
+                return ((1 << (fim - inicio)) - 1) << (self.dia * SLOT_HOURS + inicio - SLOT_FIRST_HOUR)
+
+        situacao: Interned
+        turma: Interned
         curso: 'RefCurso'
         professor_principal: Optional['RefProfessor'] = None
         professores_alocados: list['RefProfessor']
         professores_visitantes: list['RefProfessor']
 
         """Curso da oferta"""
-        normal: Optional[Vagas] = None
+        normal: Optional[Annotated[Vagas, AfterValidator(_shared)]] = None
         """Vagas normais"""
-        especial: Optional[Vagas] = None
+        especial: Optional[Annotated[Vagas, AfterValidator(_shared)]] = None
         """Vagas especiais"""
         horarios: list[HorarioLocal] = Field(default_factory=list)
         """Horários e locais da oferta"""
         semestre: Optional[int] = None
         """Se a oferta é semestral, qual o semestre atual dela"""
-        bimestre: Optional[str] = None
+        bimestre: Optional[Interned] = None
         """Se a oferta é bimestral, qual o bimestre atual dela"""
 
+        @cached_property
+        def slots(self) -> int:
+            # one bit per (dia, hora), see SLOT_*; cleared by Disciplina.oferta_changed
+            mask = 0
+            for h in self.horarios:
+                mask |= h.slots
+            return mask
+
     cod: str
     """Código da disciplina"""
     nome: str
@@ -315,6 +395,8 @@ class Disciplina(RefBy[str]):
     def merge_ofertas(self, periodo: str, other_ofertas: list[Oferta]):
             if periodo not in self.ofertas:
                 self.ofertas[periodo] = other_ofertas
+                for oferta in other_ofertas:
+                    self.oferta_changed(periodo, oferta)
             else:
                 for other_oferta in other_ofertas:
                     for oferta in self.ofertas[periodo]:
@@ -327,14 +409,47 @@ class Disciplina(RefBy[str]):
                             oferta.horarios = oferta.horarios or other_oferta.horarios
                             oferta.semestre = oferta.semestre or other_oferta.semestre
                             oferta.bimestre = oferta.bimestre or other_oferta.bimestre
+                            self.oferta_changed(periodo, oferta)
                             break
                     else:
                         self.ofertas[periodo].append(other_oferta)
+                        self.oferta_changed(periodo, other_oferta)
+
+    def replace_ofertas(self, periodo: str, ofertas: list[Oferta]):
+        # the new list wins, turmas missing from it are dropped
+        old = self.ofertas.get(periodo, [])
+        self.ofertas[periodo] = ofertas
+        kept = {id(oferta) for oferta in ofertas}
+        for oferta in old:
+            if id(oferta) not in kept:
+                self.oferta_removed(oferta)
+        for oferta in ofertas:
+            self.oferta_changed(periodo, oferta)
+
+    def oferta_changed(self, periodo: str, oferta: Oferta):
+        oferta.__dict__.pop('slots', None)
+        for hook in _oferta_hooks:
+            hook(self, periodo, oferta)
+
+    def oferta_removed(self, oferta: Oferta):
+        for hook in _oferta_removed_hooks:
+            hook(oferta)
+
+    def _registered(self) -> None:
+        if not _oferta_hooks: return
+        for periodo, ofertas in self.ofertas.items():
+            for oferta in ofertas:
+                self.oferta_changed(periodo, oferta)
 
     def _merge(self, other: Self) -> None:
         for periodo, ofertas in other.ofertas.items():
             self.merge_ofertas(periodo, ofertas)
 
+# called whenever an oferta is added to or changed in the registry
+_oferta_hooks: list[Callable[[Disciplina, str, Disciplina.Oferta], None]] = []
+# called whenever an oferta is dropped from the registry
+_oferta_removed_hooks: list[Callable[[Disciplina.Oferta], None]] = []
+
 class Cardapio(RefBy[date]):
     _key_type = date
     data: date
@@ -364,19 +479,172 @@ class Cardapio(RefBy[date]):
         if self.jantar is None:
             self.jantar = other.jantar
 
-def load(data: dict[str, Any]):
-    for curso in data['cursos']:
-        Curso(**curso)
-    for local in data['locais']:
-        Local(**local)
-    for professor in data['professores']:
-        Professor(**professor)
-    for disciplina in data['disciplinas']:
-        Disciplina(**disciplina)
-    for periodo in data['periodos']:
-        Periodo(**periodo)
-    for cardapio in data['cardapios']:
-        Cardapio(**cardapio)
+M = TypeVar('M', bound=BaseModel)
+_constructors: dict[tuple[type[BaseModel], bool], Callable[[dict[str, Any]], Any]] = {}
+_setattr = object.__setattr__
+
+def _identity(v: Any) -> Any:
+    return v
+
+def _new(cls: type[M], values: dict[str, Any], fields_set: Optional[set[str]] = None) -> M:
+    inst = object.__new__(cls)
+    _setattr(inst, '__dict__', values)
+    _setattr(inst, '__pydantic_fields_set__', set(values) if fields_set is None else fields_set)
+    _setattr(inst, '__pydantic_extra__', None)
+    _setattr(inst, '__pydantic_private__', None)
+    return inst
+
+# refs only change through resolve(), so while loading one instance per key is shared
+_shared_refs: Optional[dict[tuple[type, Any], Ref]] = None
+
+def _construct_ref(cls: type[Ref]) -> Callable[[Any], Any]:
+    def f(v: Any) -> Any:
+        if isinstance(v, cls): return v
+        shared = _shared_refs
+        if shared is not None:
+            r = shared.get((cls, v))
+            if r is not None: return r
+        r = _new(cls, {'root': sys.intern(v) if isinstance(v, str) else v})
+        if shared is not None:
+            shared[cls, v] = r
+        return r
+    return f
+
+def _then(f: Callable[[Any], Any], g: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    if f is _identity: return g
+    return lambda v: g(f(v))
+
+def _constructor(tp: Any, typed: bool) -> Callable[[Any], Any]:
+    # typed values already have their final type, only refs still need wrapping
+    origin = get_origin(tp)
+    if origin is Annotated:
+        for meta in tp.__metadata__:
+            ref = getattr(getattr(meta, 'func', None), '__self__', None)
+            if isinstance(ref, type) and issubclass(ref, Ref):
+                return _construct_ref(ref)
+        f = _constructor(get_args(tp)[0], typed)
+        for meta in tp.__metadata__:
+            if isinstance(meta, AfterValidator):
+                f = _then(f, meta.func)
+        return f
+    if origin is Union or origin is UnionType:
+        args = [a for a in get_args(tp) if a is not type(None)]
+        if len(args) != 1: return _identity
+        f = _constructor(args[0], typed)
+        if f is _identity: return _identity
+        return lambda v: None if v is None else f(v)
+    if origin is list:
+        f = _constructor(get_args(tp)[0], typed)
+        if f is _identity: return _identity if typed else list
+        return lambda v: [f(x) for x in v]
+    if origin is dict:
+        kt, vt = get_args(tp)
+        # int keys come back from JSON as str
+        fk = int if kt is int and not typed else _identity
+        fv = _constructor(vt, typed)
+        if typed and fv is _identity: return _identity
+        return lambda v: {fk(k): fv(x) for k, x in v.items()}
+    if typed:
+        return _identity
+    if tp is date:
+        return lambda v: v if isinstance(v, date) else date.fromisoformat(v)
+    if isinstance(tp, type) and issubclass(tp, BaseModel):
+        model = tp
+        return lambda v: v if isinstance(v, model) else construct(model, v)
+    return _identity
+
+def _default(info: Any) -> Callable[[], Any]:
+    # FieldInfo.get_default inspects the factory signature on every call
+    factory = info.default_factory
+    if factory is not None and not getattr(info, 'default_factory_takes_validated_data', False):
+        return factory
+    if factory is None and isinstance(info.default, (type(None), bool, int, float, str)):
+        default = info.default
+        return lambda: default
+    return lambda: info.get_default(call_default_factory=True)
+
+def _compile(cls: type[BaseModel], typed: bool) -> Callable[[dict[str, Any]], Any]:
+    hints = get_type_hints(cls, include_extras=True)
+    names = tuple(cls.model_fields)
+    fields = [(name, _constructor(hints[name], typed), None if info.is_required() else _default(info))
+              for name, info in cls.model_fields.items()]
+    converted = [(name, f) for name, f, _ in fields if f is not _identity]
+    private = {name: attr.get_default() for name, attr in cls.__private_attributes__.items()}
+
+    def build(data: dict[str, Any]) -> Any:
+        if len(data) == len(names) and (not typed or tuple(data) == names):
+            # every field in declaration order, as dump() writes them;
+            # typed callers hand over a fresh dict that can be kept as is
+            values = data if typed else dict(data)
+            for name, f in converted:
+                values[name] = f(values[name])
+            fields_set = set(values)
+        else:
+            # fields go in declaration order, dumps follow __dict__
+            values = {}
+            for name, f, default in fields:
+                if name in data:
+                    values[name] = f(data[name])
+                elif default is not None:
+                    values[name] = default()
+            fields_set = set(data) if typed else values.keys() & data.keys()
+        inst = _new(cls, values, fields_set)
+        if private:
+            _setattr(inst, '__pydantic_private__', dict(private))
+        return inst
+    return build
+
+def construct(cls: type[M], data: dict[str, Any], typed: bool = False) -> M:
+    # like model_construct, but recursive and without per-call introspection
+    build = _constructors.get((cls, typed))
+    if build is None:
+        build = _constructors[cls, typed] = _compile(cls, typed)
+    return build(data)
+
+_load_order: list[tuple[str, type[RefBy]]] = [
+    ('cursos', Curso),
+    ('locais', Local),
+    ('professores', Professor),
+    ('disciplinas', Disciplina),
+    ('periodos', Periodo),
+    ('cardapios', Cardapio),
+]
+
+@contextmanager
+def _loading() -> Generator[None, None, None]:
+    global _shared_refs
+    # loading only allocates, so collecting cycles meanwhile is wasted work
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    _shared_refs = {}
+    try:
+        yield
+    finally:
+        _shared_refs = None
+        if gc_enabled:
+            gc.enable()
+
+def load(data: dict[str, Any], trusted: bool = False):
+    with _loading():
+        if trusted:
+            # snapshot written by dump(): skip validation, one registry insert per entity
+            for name, cls in _load_order:
+                for d in data[name]:
+                    cls._register(construct(cls, d))
+            return
+
+        for curso in data['cursos']:
+            Curso(**curso)
+        for local in data['locais']:
+            Local(**local)
+        for professor in data['professores']:
+            Professor(**professor)
+        for disciplina in data['disciplinas']:
+            Disciplina(**disciplina)
+        for periodo in data['periodos']:
+            Periodo(**periodo)
+        for cardapio in data['cardapios']:
+            Cardapio(**cardapio)
 
 def _dump(data: Iterable[BaseModel]) -> Any:
     return [d.model_dump() for d in data]
@@ -391,6 +659,33 @@ def dump() -> dict[str, Any]:
         'cardapios': _dump(Cardapio._values())
     }
 
+def dump_to(fp: TextIO, indent: Optional[str] = None) -> None:
+    # same document as json.dumps(dump(), indent=indent), one entity at a time
+    if indent is None:
+        nl = sep = ''
+        item = ','
+    else:
+        nl, sep = '\n', ' '
+        item = ',\n' + indent * 2
+    fp.write('{')
+    for n, (name, cls) in enumerate(_load_order):
+        fp.write(f'{"," if n else ""}{nl}{indent or ""}"{name}":{sep}[')
+        first = True
+        for inst in cls._values():
+            if first:
+                fp.write(f'{nl}{(indent or "") * 2}')
+                first = False
+            else:
+                fp.write(item)
+            if indent is None:
+                fp.write(inst.model_dump_json())
+            else:
+                fp.write(json.dumps(inst.model_dump(), indent=indent).replace('\n', '\n' + indent * 2))
+        if not first:
+            fp.write(f'{nl}{indent or ""}')
+        fp.write(']')
+    fp.write(nl + '}')
+
 class _RefDisciplina(Ref[str, Disciplina]):
     _ref_type = Disciplina
 RefDisciplina = Annotated[str | _RefDisciplina | Disciplina, BeforeValidator(_RefDisciplina.r)]
@@ -421,5 +716,6 @@ __all__ = [
     "Professor",
     "Disciplina",
     "load",
-    "dump"
+    "dump",
+    "dump_to"
 ]
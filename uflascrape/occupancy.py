@@ -0,0 +1,136 @@
+from array import array
+import bisect
+
+from . import model
+from .model import Disciplina, Local, RefLocal, RefPeriodo, _RefLocal, _RefPeriodo, _bits, SLOT_DAYS, SLOT_HOURS, SLOT_FIRST_HOUR
+
+Oferta = Disciplina.Oferta
+N_SLOTS = SLOT_DAYS * SLOT_HOURS
+
+def _slot(dia: int, hora: int) -> int:
+    # -1 outside the grid, where no aula is ever counted (see HorarioLocal.slots)
+    if not 0 <= dia < SLOT_DAYS or not 0 <= hora - SLOT_FIRST_HOUR < SLOT_HOURS:
+        return -1
+    return dia * SLOT_HOURS + hora - SLOT_FIRST_HOUR
+
+class Occupancy:
+    def __init__(self, periodo: RefPeriodo):
+        self.periodo = _RefPeriodo.r(periodo).key
+        self.locais: list[str] = []
+        self.ids: dict[str, int] = {}
+        self.capacidade: list[int] = []
+        # aulas per (local, slot), row-major local x dia x hora
+        self.counts = array('H')
+        # for each slot, bitset of the local ids in use
+        self.occupied = [0] * N_SLOTS
+        # (capacidade, id) sorted, to get the rooms with enough seats
+        self._by_capacidade: list[tuple[int, int]] = []
+        self._capacidade_masks: dict[int, int] = {}
+        # ids of locais not in the registry yet, capacidade -1 until they are
+        self._unresolved: set[int] = set()
+        self._ofertas: dict[int, list[tuple[int, int]]] = {}
+
+    def _local(self, local: RefLocal) -> int:
+        ref = _RefLocal.r(local)
+        i = self.ids.get(ref.key)
+        if i is None:
+            i = self.ids[ref.key] = len(self.locais)
+            self.locais.append(ref.key)
+            self.capacidade.append(-1)
+            self.counts.extend([0] * N_SLOTS)
+            bisect.insort(self._by_capacidade, (-1, i))
+            self._unresolved.add(i)
+            self._resolve(i)
+        return i
+
+    def _resolve(self, i: int) -> None:
+        ref = _RefLocal.r(self.locais[i])
+        if not ref.resolve(): return
+        self._unresolved.discard(i)
+        cap = ref.deref.ocupacao
+        if cap == self.capacidade[i]: return
+        del self._by_capacidade[bisect.bisect_left(self._by_capacidade, (self.capacidade[i], i))]
+        bisect.insort(self._by_capacidade, (cap, i))
+        self.capacidade[i] = cap
+        self._capacidade_masks.clear()
+
+    def remove(self, oferta: Oferta) -> None:
+        for i, mask in self._ofertas.pop(id(oferta), []):
+            base = i * N_SLOTS
+            for s in _bits(mask):
+                self.counts[base + s] -= 1
+                if self.counts[base + s] == 0:
+                    self.occupied[s] &= ~(1 << i)
+
+    def update(self, disciplina: Disciplina, periodo: str, oferta: Oferta) -> None:
+        if periodo != self.periodo: return
+        self.remove(oferta)
+        aulas = []
+        for h in oferta.horarios:
+            mask = h.slots
+            if not mask: continue
+            i = self._local(h.local)
+            base = i * N_SLOTS
+            for s in _bits(mask):
+                self.counts[base + s] += 1
+                self.occupied[s] |= 1 << i
+            aulas.append((i, mask))
+        self._ofertas[id(oferta)] = aulas
+
+    def _capacidade_mask(self, capacidade: int) -> int:
+        for i in list(self._unresolved):
+            self._resolve(i)
+        mask = self._capacidade_masks.get(capacidade)
+        if mask is None:
+            mask = 0
+            start = bisect.bisect_left(self._by_capacidade, (capacidade, -1))
+            for _, i in self._by_capacidade[start:]:
+                mask |= 1 << i
+            self._capacidade_masks[capacidade] = mask
+        return mask
+
+    def aulas(self, local: RefLocal, dia: int, hora: int) -> int:
+        i = self.ids.get(_RefLocal.r(local).key)
+        s = _slot(dia, hora)
+        if i is None or s < 0: return 0
+        return self.counts[i * N_SLOTS + s]
+
+    def slots(self, local: RefLocal) -> int:
+        i = self.ids.get(_RefLocal.r(local).key)
+        if i is None: return 0
+        base = i * N_SLOTS
+        mask = 0
+        for s in range(N_SLOTS):
+            if self.counts[base + s]:
+                mask |= 1 << s
+        return mask
+
+    def free(self, dia: int, hora: int, capacidade: int = 0, horas: int = 1) -> list[str]:
+        used = 0
+        for h in range(hora, hora + horas):
+            s = _slot(dia, h)
+            if s >= 0: used |= self.occupied[s]
+        free = self._capacidade_mask(capacidade) & ~used
+        return [self.locais[i] for i in _bits(free)]
+
+_occupancies: dict[str, Occupancy] = {}
+
+def occupancy(periodo: RefPeriodo) -> Occupancy:
+    p = _RefPeriodo.r(periodo).key
+    occ = _occupancies.get(p)
+    if occ is None:
+        occ = Occupancy(p)
+        for local in Local._values():
+            occ._local(local)
+        for disc in Disciplina._values():
+            for oferta in disc.ofertas.get(p, []):
+                occ.update(disc, p, oferta)
+        model._oferta_hooks.append(occ.update)
+        model._oferta_removed_hooks.append(occ.remove)
+        _occupancies[p] = occ
+    return occ
+
+__all__ = [
+    "Occupancy",
+    "occupancy",
+]
@@ -0,0 +1,110 @@
+from typing import Any, Awaitable, Callable, Iterable, NamedTuple, Optional, Sequence
+from concurrent.futures import Executor
+import asyncio
+import inspect
+import time
+
+from .log import *
+
+class Stage(NamedTuple):
+    name: str
+    # coroutine function, or plain function run on the loop (or in executor, if given);
+    # returning None drops the item
+    fn: Callable[[Any], Any]
+    workers: int = 1
+    executor: Optional[Executor] = None
+    # items waiting for this stage; a full queue blocks the stage before it
+    maxsize: int = 16
+
+class StageStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.start: Optional[float] = None
+        self.end: Optional[float] = None
+        self.max_queue = 0
+
+    @property
+    def wall(self) -> float:
+        if self.start is None or self.end is None: return 0.0
+        return self.end - self.start
+
+    @property
+    def throughput(self) -> float:
+        return self.items / self.wall if self.wall else 0.0
+
+    def __str__(self) -> str:
+        return (f'{self.name}: {self.items} items in {self.wall:.2f}s ({self.throughput:.1f}/s), '
+                f'busy {self.busy:.2f}s, queue <= {self.max_queue}')
+
+_DONE = object()
+
+def _call(stage: Stage) -> Callable[[Any], Awaitable[Any]]:
+    if inspect.iscoroutinefunction(stage.fn):
+        return stage.fn
+    if stage.executor is not None:
+        async def in_executor(item: Any) -> Any:
+            return await asyncio.get_running_loop().run_in_executor(stage.executor, stage.fn, item)
+        return in_executor
+    async def inline(item: Any) -> Any:
+        return stage.fn(item)
+    return inline
+
+async def run(items: Iterable[Any], stages: Sequence[Stage]) -> list[StageStats]:
+    # each stage pulls from its own bounded queue and feeds the next one's
+    queues = [asyncio.Queue(stage.maxsize) for stage in stages]
+    stats = [StageStats(stage.name) for stage in stages]
+    remaining = [stage.workers for stage in stages]
+
+    async def worker(i: int) -> None:
+        stage, st, call = stages[i], stats[i], _call(stages[i])
+        inbox = queues[i]
+        outbox = queues[i + 1] if i + 1 < len(stages) else None
+        while True:
+            item = await inbox.get()
+            if item is _DONE: break
+            t = time.perf_counter()
+            if st.start is None: st.start = t
+            result = await call(item)
+            st.end = time.perf_counter()
+            st.busy += st.end - t
+            st.items += 1
+            if outbox is not None and result is not None:
+                await outbox.put(result)
+                st.max_queue = max(st.max_queue, outbox.qsize())
+        remaining[i] -= 1
+        # the last worker out tells every worker of the next stage
+        if remaining[i] == 0 and outbox is not None:
+            for _ in range(stages[i + 1].workers):
+                await outbox.put(_DONE)
+
+    async def source() -> None:
+        for item in items:
+            await queues[0].put(item)
+        for _ in range(stages[0].workers):
+            await queues[0].put(_DONE)
+
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(source())
+            for i, stage in enumerate(stages):
+                for _ in range(stage.workers):
+                    tg.create_task(worker(i))
+    except ExceptionGroup as e:
+        # a failing stage cancels all the others, raise its own error
+        raise e.exceptions[0]
+
+    for st in stats:
+        info(str(st))
+    return stats
+
+def run_pipeline(items: Iterable[Any], stages: Sequence[Stage]) -> list[StageStats]:
+    return asyncio.run(run(items, stages))
+
+__all__ = [
+    "Stage",
+    "StageStats",
+    "run",
+    "run_pipeline",
+]
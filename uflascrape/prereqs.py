@@ -0,0 +1,144 @@
+from typing import Iterable, Optional
+
+from .model import Curso, RefDisciplina, _RefDisciplina, _bits
+
+MatrizCurricular = Curso.MatrizCurricular
+
+class PrereqGraph:
+    def __init__(self, matriz: MatrizCurricular):
+        # node i is disciplina nodes[i]; every set of nodes is an int bitmask
+        self.nodes: list[str] = []
+        self.ids: dict[str, int] = {}
+        # direct reqs_fortes + reqs_minimos, and coreqs, of each node
+        self.reqs: list[int] = []
+        self.coreqs: list[int] = []
+        # nodes listed in the matriz itself, not only referenced as a requisite
+        self.in_matriz = 0
+
+        for dm in self._disciplinas(matriz):
+            i = self._node(dm.disc)
+            self.in_matriz |= 1 << i
+            for r in dm.reqs_fortes + dm.reqs_minimos:
+                self.reqs[i] |= 1 << self._node(r)
+            for r in dm.coreqs:
+                self.coreqs[i] |= 1 << self._node(r)
+
+        # topological layer of each node, -1 inside a cycle
+        self.layer: list[int] = [0] * len(self.nodes)
+        self.ancestors_mask, self.descendants_mask = self._closure()
+
+    @staticmethod
+    def _disciplinas(matriz: MatrizCurricular) -> Iterable[MatrizCurricular.DisciplinaMatriz]:
+        for l in matriz.obrigatorias.values():
+            yield from l
+        for l in matriz.eletivas.values():
+            yield from l
+
+    def _node(self, disc: RefDisciplina) -> int:
+        k = _RefDisciplina.r(disc).key
+        i = self.ids.get(k)
+        if i is None:
+            i = self.ids[k] = len(self.nodes)
+            self.nodes.append(k)
+            self.reqs.append(0)
+            self.coreqs.append(0)
+        return i
+
+    def _closure(self) -> tuple[list[int], list[int]]:
+        n = len(self.nodes)
+        # Kahn's algorithm over the reversed edges gives a topological order
+        pending = [r.bit_count() for r in self.reqs]
+        unlocks = [0] * n
+        for i, r in enumerate(self.reqs):
+            for j in _bits(r):
+                unlocks[j] |= 1 << i
+        order = [i for i in range(n) if pending[i] == 0]
+        for i in order:
+            for j in _bits(unlocks[i]):
+                pending[j] -= 1
+                self.layer[j] = max(self.layer[j], self.layer[i] + 1)
+                if pending[j] == 0:
+                    order.append(j)
+
+        anc = [0] * n
+        for i in order:
+            for j in _bits(self.reqs[i]):
+                anc[i] |= (1 << j) | anc[j]
+
+        # whatever Kahn left behind is in or after a cycle: iterate until stable
+        cyclic = [i for i in range(n) if pending[i] > 0]
+        for i in cyclic:
+            self.layer[i] = -1
+        changed = bool(cyclic)
+        while changed:
+            changed = False
+            for i in cyclic:
+                a = anc[i]
+                for j in _bits(self.reqs[i]):
+                    a |= (1 << j) | anc[j]
+                if a != anc[i]:
+                    anc[i] = a
+                    changed = True
+
+        desc = [0] * n
+        for i, a in enumerate(anc):
+            for j in _bits(a):
+                desc[j] |= 1 << i
+        return anc, desc
+
+    def _codes(self, mask: int) -> list[str]:
+        return [self.nodes[i] for i in _bits(mask)]
+
+    def _mask(self, discs: Iterable[RefDisciplina]) -> int:
+        mask = 0
+        for d in discs:
+            i = self.ids.get(_RefDisciplina.r(d).key)
+            if i is not None:
+                mask |= 1 << i
+        return mask
+
+    def __contains__(self, disc: RefDisciplina) -> bool:
+        return _RefDisciplina.r(disc).key in self.ids
+
+    def ancestors(self, disc: RefDisciplina) -> list[str]:
+        return self._codes(self.ancestors_mask[self.ids[_RefDisciplina.r(disc).key]])
+
+    def descendants(self, disc: RefDisciplina) -> list[str]:
+        return self._codes(self.descendants_mask[self.ids[_RefDisciplina.r(disc).key]])
+
+    def layers(self) -> list[list[str]]:
+        n_layers = max(self.layer, default=-1) + 1
+        layers: list[list[str]] = [[] for _ in range(n_layers)]
+        for i, l in enumerate(self.layer):
+            if l >= 0 and self.in_matriz >> i & 1:
+                layers[l].append(self.nodes[i])
+        return layers
+
+    def eligible(self, completed: Iterable[RefDisciplina]) -> list[str]:
+        done = self._mask(completed)
+        mask = 0
+        for i in _bits(self.in_matriz & ~done):
+            if self.reqs[i] & ~done == 0:
+                mask |= 1 << i
+        return self._codes(mask)
+
+_graphs: dict[str, tuple[MatrizCurricular, PrereqGraph]] = {}
+
+def prereq_graph(matriz: MatrizCurricular) -> PrereqGraph:
+    # compiled once per matriz object; a matriz parsed again gets a new graph
+    cached = _graphs.get(matriz.cod)
+    if cached is not None and cached[0] is matriz:
+        return cached[1]
+    graph = PrereqGraph(matriz)
+    _graphs[matriz.cod] = (matriz, graph)
+    return graph
+
+def curso_graph(curso: Curso) -> Optional[PrereqGraph]:
+    if not curso.matrizes: return None
+    return prereq_graph(curso.matrizes[-1])
+
+__all__ = [
+    "PrereqGraph",
+    "prereq_graph",
+    "curso_graph",
+]
@@ -0,0 +1,115 @@
+from typing import Optional, NamedTuple, Iterable, Hashable
+from collections import defaultdict
+
+from . import model
+from .model import Disciplina, RefProfessor, RefLocal, RefCurso, RefPeriodo, _RefProfessor, _RefLocal, _RefCurso, _RefPeriodo
+
+Oferta = Disciplina.Oferta
+HorarioLocal = Oferta.HorarioLocal
+
+class Hit(NamedTuple):
+    disciplina: Disciplina
+    periodo: str
+    oferta: Oferta
+
+class Index:
+    def __init__(self):
+        # every index maps (periodo, key) to the hits in insertion order
+        self._professor: dict[tuple[str, str], dict[int, Hit]] = defaultdict(dict)
+        self._local: dict[tuple[str, str], dict[int, Hit]] = defaultdict(dict)
+        self._horario: dict[tuple[str, int, int], dict[int, Hit]] = defaultdict(dict)
+        self._curso: dict[tuple[str, str], dict[int, Hit]] = defaultdict(dict)
+        self._periodo: dict[str, dict[int, Hit]] = defaultdict(dict)
+        self._keys: dict[int, list[tuple[dict, Hashable]]] = {}
+
+    def remove(self, oferta: Oferta) -> None:
+        oid = id(oferta)
+        for idx, key in self._keys.pop(oid, []):
+            entries = idx[key]
+            entries.pop(oid, None)
+            if not entries:
+                del idx[key]
+
+    def update(self, disciplina: Disciplina, periodo: str, oferta: Oferta) -> None:
+        oid = id(oferta)
+        if oid in self._keys:
+            self.remove(oferta)
+        hit = Hit(disciplina, periodo, oferta)
+
+        keys: list[tuple[dict, Hashable]] = [
+            (self._periodo, periodo),
+            (self._curso, (periodo, _RefCurso.r(oferta.curso).key)),
+        ]
+        profs = oferta.professores_alocados + oferta.professores_visitantes
+        if oferta.professor_principal is not None:
+            profs = [oferta.professor_principal] + profs
+        for prof in profs:
+            keys.append((self._professor, (periodo, _RefProfessor.r(prof).key)))
+        for h in oferta.horarios:
+            keys.append((self._local, (periodo, _RefLocal.r(h.local).key)))
+            for hora in h.horas():
+                keys.append((self._horario, (periodo, h.dia, hora)))
+
+        for idx, key in keys:
+            idx[key][oid] = hit
+        self._keys[oid] = keys
+
+    def _periodos(self, periodo: Optional[RefPeriodo]) -> Iterable[str]:
+        if periodo is None: return list(self._periodo)
+        return [_RefPeriodo.r(periodo).key]
+
+    def _get(self, idx: dict, periodo: Optional[RefPeriodo], *key: Hashable) -> list[Hit]:
+        hits: dict[int, Hit] = {}
+        for p in self._periodos(periodo):
+            hits.update(idx.get((p, *key), {}))
+        return list(hits.values())
+
+    def by_periodo(self, periodo: RefPeriodo) -> list[Hit]:
+        return list(self._periodo.get(_RefPeriodo.r(periodo).key, {}).values())
+
+    def by_curso(self, curso: RefCurso, periodo: Optional[RefPeriodo] = None) -> list[Hit]:
+        return self._get(self._curso, periodo, _RefCurso.r(curso).key)
+
+    def by_professor(self, professor: RefProfessor, periodo: Optional[RefPeriodo] = None) -> list[Hit]:
+        return self._get(self._professor, periodo, _RefProfessor.r(professor).key)
+
+    def by_horario(self, dia: int, hora: int, periodo: Optional[RefPeriodo] = None) -> list[Hit]:
+        return self._get(self._horario, periodo, dia, hora)
+
+    def by_local(self,
+                 local: RefLocal,
+                 dia: Optional[int] = None,
+                 periodo: Optional[RefPeriodo] = None) -> list[tuple[Hit, HorarioLocal]]:
+        key = _RefLocal.r(local).key
+        aulas = []
+        for hit in self._get(self._local, periodo, key):
+            for h in hit.oferta.horarios:
+                if _RefLocal.r(h.local).key == key and (dia is None or h.dia == dia):
+                    aulas.append((hit, h))
+        return aulas
+
+    def disciplinas(self, curso: RefCurso, periodo: Optional[RefPeriodo] = None) -> list[Disciplina]:
+        discs = {hit.disciplina.key: hit.disciplina for hit in self.by_curso(curso, periodo)}
+        return list(discs.values())
+
+_index: Optional[Index] = None
+
+def index() -> Index:
+    global _index
+    if _index is None:
+        idx = Index()
+        with model._loading():
+            for disc in Disciplina._values():
+                for periodo, ofertas in disc.ofertas.items():
+                    for oferta in ofertas:
+                        idx.update(disc, periodo, oferta)
+        model._oferta_hooks.append(idx.update)
+        model._oferta_removed_hooks.append(idx.remove)
+        _index = idx
+    return _index
+
+__all__ = [
+    "Hit",
+    "Index",
+    "index",
+]
@@ -2,7 +2,7 @@ from pydantic import BaseModel
 from typing import Optional, Mapping, Any
 from httpx import Client, Response
 from ..model import Curso, _RefDisciplina, Disciplina, Periodo, _RefPeriodo, RefDisciplina, RefPeriodo, Cardapio
-from .parser import parse_html, get_cursos, list_matrizes, parse_matriz, parse_disciplina_pub, parse_oferta_pub, list_ofertas, parse_consulta_oferta, parse_oferta, get_periodos, parse_cardapio
+from .parser import parse_html, get_cursos, list_matrizes, parse_matriz, parse_disciplina_pub, parse_oferta_pub, list_ofertas, parse_consulta_oferta, parse_oferta_html, get_periodos, parse_cardapio
 from ..log import *
 from datetime import date
 
@@ -131,7 +131,8 @@ class Sig:
             matrizes.append(matriz)
         return matrizes
 
-    def get_disciplina_pub(self, disc: RefDisciplina, periodo: RefPeriodo, get_ofertas: bool = True) -> Disciplina:
+    def fetch_disciplina_pub(self, disc: RefDisciplina, periodo: RefPeriodo, get_ofertas: bool = True) -> tuple[str, list[str]]:
+        # raw pages only: the disciplina and each of its public ofertas
         info(f'Getting disciplina {disc} ({periodo}) ({get_ofertas=})')
 
         periodo = _RefPeriodo.d(periodo)
@@ -145,15 +146,13 @@ class Sig:
             },
             params={'xml': 1}
         )
-
-        root = parse_html(r.text)
-        d = parse_disciplina_pub(root)
+        text = r.text
 
         # return early if we don't need to get ofertas
-        if not get_ofertas: return d
+        if not get_ofertas: return text, []
 
-        ofertas = []
-        cod_ofertas = list_ofertas(root)
+        pages = []
+        cod_ofertas = list_ofertas(parse_html(text))
         for cod_oferta in cod_ofertas:
             info(f'Getting oferta {cod_oferta=}')
             params = {'cod_oferta_disciplina': cod_oferta, 'cod_periodo_letivo': cod_periodo}
@@ -161,15 +160,21 @@ class Sig:
                 'GET', 'consultar_horario_pub',
                 params=_replace(params, op='abrir')
             )
-            root = parse_html(r.text)
-            oferta = parse_oferta_pub(root)
+            pages.append(r.text)
             self._sig_request(
                 'GET', 'consultar_horario_pub',
                 params=_replace(params, op='fechar'),
             )
-            ofertas.append(oferta)
 
-        d.ofertas[periodo.key] = ofertas
+        return text, pages
+
+    def get_disciplina_pub(self, disc: RefDisciplina, periodo: RefPeriodo, get_ofertas: bool = True) -> Disciplina:
+        text, pages = self.fetch_disciplina_pub(disc, periodo, get_ofertas)
+        d = parse_disciplina_pub(parse_html(text))
+        if not get_ofertas: return d
+
+        ofertas = [parse_oferta_pub(parse_html(page)) for page in pages]
+        d.replace_ofertas(_RefPeriodo.r(periodo).key, ofertas)
         return d
 
     def list_ofertas(self,
@@ -209,7 +214,8 @@ class Sig:
 
         return ofertas
 
-    def get_oferta(self, oferta: Disciplina.OfertaParcial) -> Disciplina.Oferta:
+    def fetch_oferta(self, oferta: Disciplina.OfertaParcial) -> str:
+        # raw page only, so parsing can happen elsewhere
         info(f'Getting oferta {oferta}')
         if self._last_disc != _RefDisciplina.r(oferta.disc).key:
             self.list_ofertas(disciplina=oferta.disc)
@@ -219,16 +225,17 @@ class Sig:
             'GET', 'consultar_horario',
             params=_replace(params, op='abrir')
         )
-
-        root = parse_html(r.text)
-        parsed = parse_oferta(root)
+        text = r.text
 
         r = self._sig_request(
             'GET', 'consultar_horario',
             params=_replace(params, op='fechar')
         )
 
-        return parsed
+        return text
+
+    def get_oferta(self, oferta: Disciplina.OfertaParcial) -> Disciplina.Oferta:
+        return parse_oferta_html(self.fetch_oferta(oferta))
 
     def get_cardapio(self, data: date) -> Cardapio:
         r = self._sig_request(
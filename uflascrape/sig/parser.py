@@ -1,13 +1,42 @@
 import html
 import html.parser
 from pydantic import BaseModel, Field
-from typing import Optional, Generator, Callable
-from ..model import Curso, Disciplina, RefDisciplina, Local, Professor, RefProfessor, Periodo, Cardapio
+from typing import Optional, Generator, Callable, TypeVar, Any
+from ..model import Curso, Disciplina, RefDisciplina, Local, Professor, RefProfessor, Periodo, Cardapio, RefBy, construct
 import re
 from ..log import *
 from datetime import date
+import os
 import weakref
 
+# values coming out of the parser are already typed, so models are built
+# without validation; set UFLASCRAPE_VALIDATE=1 to validate them while debugging
+VALIDATE = os.environ.get('UFLASCRAPE_VALIDATE', '') not in ('', '0')
+
+M = TypeVar('M', bound=BaseModel)
+
+def _make(cls: type[M], **data: Any) -> M:
+    if VALIDATE:
+        return cls(**data)
+    inst = construct(cls, data, typed=True)
+    if issubclass(cls, RefBy):
+        return cls._register(inst)
+    return inst
+
+def _professor(full: str) -> Professor:
+    if VALIDATE:
+        return Professor.from_full(full)
+    nome, _, departamento = full.partition(' (')
+    return _make(Professor, nome=nome, departamento=departamento[:-1])
+
+def _horario(hora: str) -> Disciplina.Oferta.HorarioLocal.Horario:
+    Horario = Disciplina.Oferta.HorarioLocal.Horario
+    if VALIDATE:
+        return Horario.from_hora(hora)
+    if hora == '': return _make(Horario, hora=-1, minuto=-1)
+    h, m = hora.split(':')
+    return _make(Horario, hora=int(h), minuto=int(m))
+
 class Tag(BaseModel):
     name: str
     children: list['Tag'] = Field(default_factory=list)
@@ -75,7 +104,7 @@ self_closing = {
 class HtmlParser(html.parser.HTMLParser):
     def reset(self) -> None:
         super().reset()
-        self._root = Tag(name="#root")
+        self._root = _make(Tag, name="#root")
         self._stack = [self._root]
 
     @property
@@ -83,7 +112,7 @@ class HtmlParser(html.parser.HTMLParser):
         return self._stack[-1]
 
     def handle_starttag(self, tag_name: str, attrs: list[tuple[str, str | None]]) -> None:
-        tag = Tag(name=tag_name)
+        tag = _make(Tag, name=tag_name)
         siblings = self._current.children
         if siblings:
             siblings[-1]._next = weakref.ref(tag)
@@ -153,7 +182,7 @@ def get_cursos(root: Tag) -> list[Curso]:
         sig_int = option.get('value')
         title = option.get('title')
         cod, nome = title.split(' - ')
-        curso = Curso(cod=cod, sig_cod_int=int(sig_int), nome=nome)
+        curso = _make(Curso, cod=cod, sig_cod_int=int(sig_int), nome=nome)
         cursos.append(curso)
     return cursos
 
@@ -164,7 +193,7 @@ def get_periodos(root: Tag) -> list[Periodo]:
         for option in group.find_by_name('option'):
             nome = option.text
             sig_cod = option.get('value')
-            periodo = Periodo(nome=f'{nome} - {campus}', sig_cod_int=sig_cod)
+            periodo = _make(Periodo, nome=f'{nome} - {campus}', sig_cod_int=sig_cod)
             periodos.append(periodo)
     return periodos
 
@@ -200,14 +229,15 @@ def parse_disciplina_row(row: Row) -> Curso.MatrizCurricular.DisciplinaMatriz:
     cod = cod.text
     nome = nome.text
     creds = int(creds.text)
-    percent = float(percent.text.replace(',', '.')) if '-' not in percent.text else 0
+    percent = float(percent.text.replace(',', '.')) if '-' not in percent.text else 0.0
     forte = parse_reqs(forte)
     minimo = parse_reqs(minimo)
     coreq = parse_reqs(coreq)
 
-    Disciplina(cod=cod, nome=nome, creditos=creds, ofertas={})
+    _make(Disciplina, cod=cod, nome=nome, creditos=creds, ofertas={})
 
-    return Curso.MatrizCurricular.DisciplinaMatriz(
+    return _make(
+        Curso.MatrizCurricular.DisciplinaMatriz,
         disc=cod,
         percentual=percent,
         reqs_fortes=forte,
@@ -261,7 +291,8 @@ def parse_matriz(root: Tag, sig_cod_int: int) -> Curso.MatrizCurricular:
     for i, matriz in enumerate(eletivas_parsed):
         r_eletivas[categorias[i]] = matriz
 
-    return Curso.MatrizCurricular(
+    return _make(
+        Curso.MatrizCurricular,
         cod=nome.replace('/', ''),
         sig_cod_int=sig_cod_int,
         nome=nome,
@@ -285,7 +316,8 @@ def parse_disciplina_pub(root: Tag) -> Disciplina:
     h_praticas = int(fields['horas práticas'])
     oferecimento = fields['oferecimento']
 
-    return Disciplina(
+    return _make(
+        Disciplina,
         cod=codigo,
         nome=nome,
         creditos=creditos,
@@ -303,7 +335,7 @@ def parse_oferta_pub(root: Tag) -> Disciplina.Oferta:
     turma = fields['turma']
     curso = fields['oferta de curso'].split(' - ')[0]
     prof = fields['docente principal']
-    prof = None if prof == '()' else Professor.from_full(prof)
+    prof = None if prof == '()' else _professor(prof)
     situacao = fields['situação']
 
     HorarioLocal = Disciplina.Oferta.HorarioLocal
@@ -325,7 +357,7 @@ def parse_oferta_pub(root: Tag) -> Disciplina.Oferta:
         if ul.name != 'ul': continue
         for li in ul.find_by_name('li'):
             nome = li.text
-            aux_prof = Professor.from_full(nome)
+            aux_prof = _professor(nome)
             professores.append(aux_prof)
 
     for dia in range(1, 8):
@@ -352,12 +384,13 @@ def parse_oferta_pub(root: Tag) -> Disciplina.Oferta:
 
             abbr = abbrs[0].text
 
-            local = Local(abbr=abbr, local=nome, ocupacao=capacidade)
+            local = _make(Local, abbr=abbr, local=nome, ocupacao=capacidade)
 
             if inicio:
                 hora += 1
 
-            h = HorarioLocal.Horario(
+            h = _make(
+                HorarioLocal.Horario,
                 hora=hora,
                 minuto=0)
             if inicio is None:
@@ -365,7 +398,8 @@ def parse_oferta_pub(root: Tag) -> Disciplina.Oferta:
             fim = h
 
         if inicio is not None and fim is not None and local is not None:
-            hl = HorarioLocal(
+            hl = _make(
+                HorarioLocal,
                 dia=dia-1,
                 inicio=inicio,
                 fim=fim,
@@ -373,7 +407,8 @@ def parse_oferta_pub(root: Tag) -> Disciplina.Oferta:
             )
             horarios.append(hl)
 
-    of = Disciplina.Oferta(
+    of = _make(
+        Disciplina.Oferta,
         situacao=situacao,
         curso=curso,
         horarios=horarios,
@@ -400,7 +435,7 @@ def parse_consulta_oferta(root: Tag) -> tuple[str, list[Disciplina.OfertaParcial
             continue
         disc = g.group('disc')
         turma = g.group('turma')
-        parcial = Disciplina.OfertaParcial(disc=disc, turma=turma, sig_cod_int=int(sig_int_code))
+        parcial = _make(Disciplina.OfertaParcial, disc=disc, turma=turma, sig_cod_int=int(sig_int_code))
         ofertas.append(parcial)
 
     return csrf.get('value'), ofertas
@@ -436,7 +471,8 @@ def parse_oferta(root: Tag) -> Oferta:
         restantes = fields['vagas restantes'].strip('*')
         pendentes = fields['solicitações pendentes']
 
-        vagas = Oferta.Vagas(
+        vagas = _make(
+            Oferta.Vagas,
             oferecidas=int(oferecidas),
             ocupadas=int(ocupadas),
             restantes=int(restantes),
@@ -467,16 +503,17 @@ def parse_oferta(root: Tag) -> Oferta:
         else:
             ini, fim = '', ''
 
-        inicio = Oferta.HorarioLocal.Horario.from_hora(ini)
-        fim = Oferta.HorarioLocal.Horario.from_hora(fim)
-        local = Local(abbr=abbr, local=nome, ocupacao=int(ocupacao.text))
+        inicio = _horario(ini)
+        fim = _horario(fim)
+        local = _make(Local, abbr=abbr, local=nome, ocupacao=int(ocupacao.text))
 
         try:
             dia = DIAS.index(dia.text.lower())
         except:
             dia = -1
 
-        h = Oferta.HorarioLocal(
+        h = _make(
+            Oferta.HorarioLocal,
             dia=dia,
             inicio=inicio,
             fim=fim,
@@ -485,7 +522,8 @@ def parse_oferta(root: Tag) -> Oferta:
 
         horarios.append(h)
 
-    return Oferta(
+    return _make(
+        Oferta,
         situacao=situacao,
         curso=curso,
         horarios=horarios,
@@ -497,11 +535,15 @@ def parse_oferta(root: Tag) -> Oferta:
         professores_visitantes=[],
     )
 
+def parse_oferta_html(text: str) -> Oferta:
+    # top level, so it can run in a process pool
+    return parse_oferta(parse_html(text))
+
 def parse_cardapio(root: Tag, data: date) -> Cardapio:
     tables = root.find_by_name('table')
 
     if not tables:
-        return Cardapio(data=data)
+        return _make(Cardapio, data=data)
 
     def split_opcoes(t: Tag) -> list[str]:
         if len(t.content) > 1:
@@ -524,7 +566,8 @@ def parse_cardapio(root: Tag, data: date) -> Cardapio:
         for row in rows:
             refeicao.append(row[i])
         base, guarnicao, salada, proteico, vegetariano, vegano, observacao = refeicao
-        refeicao_cardapio = Cardapio.Refeicao(
+        refeicao_cardapio = _make(
+            Cardapio.Refeicao,
             base=opcoes_to_str(base),
             guarnicao=opcoes_to_str(guarnicao),
             salada=opcoes_to_str(salada),
@@ -535,7 +578,8 @@ def parse_cardapio(root: Tag, data: date) -> Cardapio:
         )
         refeicoes[i] = refeicao_cardapio
 
-    return Cardapio(
+    return _make(
+        Cardapio,
         data=data,
         almoco=refeicoes[0],
         jantar=refeicoes[1],
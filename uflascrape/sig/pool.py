@@ -0,0 +1,77 @@
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Optional, TypeVar
+from concurrent.futures import Future, ProcessPoolExecutor
+from pydantic import BaseModel
+from itertools import repeat
+import asyncio
+
+from .. import model
+from ..model import RefBy, _load_order, _loading, _refs, _sources, construct
+from .parser import Tag, parse_html
+
+M = TypeVar('M', bound=BaseModel)
+
+class Parsed(NamedTuple):
+    cls: type[BaseModel]
+    # model_dump() of the result, or None when it is a registry entity (see key)
+    data: Optional[dict[str, Any]]
+    key: Any
+    # entities the parser registered, in load order: (class, [model_dump()])
+    entities: list[tuple[type[RefBy], list[dict[str, Any]]]]
+
+def _init_worker() -> None:
+    # forked workers start with a copy of the parent registry, only new entities matter
+    # the hooks would keep updating copies of the parent's indexes nobody reads
+    _refs.clear()
+    _sources.clear()
+    model._oferta_hooks.clear()
+    model._oferta_removed_hooks.clear()
+
+def _parse(fn: Callable[..., BaseModel], text: str, *args: Any) -> Parsed:
+    result = fn(parse_html(text), *args)
+    entities = [(cls, [inst.model_dump() for inst in _refs[cls].values()])
+                for _, cls in _load_order if _refs.get(cls)]
+    _refs.clear()
+    if isinstance(result, RefBy):
+        return Parsed(type(result), None, result.key, entities)
+    return Parsed(type(result), result.model_dump(), None, entities)
+
+class ParsePool:
+    # runs parser.parse_* on raw pages in worker processes; results are
+    # merged into this process' registry by merge()
+    def __init__(self, workers: Optional[int] = None):
+        self._pool = ProcessPoolExecutor(workers, initializer=_init_worker)
+
+    def submit(self, fn: Callable[..., M], text: str, *args: Any) -> Future[Parsed]:
+        return self._pool.submit(_parse, fn, text, *args)
+
+    def merge(self, parsed: Parsed) -> Any:
+        with _loading():
+            for cls, entities in parsed.entities:
+                for d in entities:
+                    cls._register(construct(cls, d))
+            if parsed.data is None:
+                return parsed.cls._get(parsed.key)
+            return construct(parsed.cls, parsed.data)
+
+    async def parse(self, fn: Callable[..., M], text: str, *args: Any) -> M:
+        parsed = await asyncio.wrap_future(self.submit(fn, text, *args))
+        return self.merge(parsed)
+
+    def map(self, fn: Callable[[Tag], M], texts: Iterable[str], chunksize: int = 8) -> Iterator[M]:
+        # in order, merged as they arrive
+        for parsed in self._pool.map(_parse, repeat(fn), texts, chunksize=chunksize):
+            yield self.merge(parsed)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> 'ParsePool':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.shutdown()
+
+__all__ = [
+    "Parsed",
+    "ParsePool",
+]
@@ -1,6 +1,10 @@
-from .model import RefCurso, RefDisciplina, RefPeriodo, RefProfessor, _RefLocal, _RefCurso, _RefDisciplina, _RefPeriodo, _RefProfessor
-from typing import Sequence
+from .model import Curso, Disciplina, Local, Periodo, Professor, RefBy, RefCurso, RefDisciplina, RefPeriodo, RefProfessor, _RefCurso, _RefDisciplina, _RefLocal, _RefPeriodo, _RefProfessor, _loading, construct
+from typing import Any, Generator, Iterable, Optional, Sequence, TextIO
 from io import StringIO
+import hashlib
+import json
+import sqlite3
+import time
 
 def _build_sql_schema() -> str:
     return '''
@@ -27,6 +31,11 @@ CREATE TABLE IF NOT EXISTS DisciplinasMatriz (
     FOREIGN KEY (id_curso) REFERENCES Cursos(id_curso)
 );
 
+CREATE TABLE IF NOT EXISTS Periodos (
+    id_periodo VARCHAR(255) PRIMARY KEY,
+    sig_cod_int VARCHAR(16)
+);
+
 CREATE TABLE IF NOT EXISTS Professores (
     id_prof INT PRIMARY KEY,
     nome_prof VARCHAR(255) NOT NULL,
@@ -37,12 +46,20 @@ CREATE TABLE IF NOT EXISTS OfertasDisciplina (
     id_oferta INT PRIMARY KEY,
     id_curso VARCHAR(8) NOT NULL,
     id_disc VARCHAR(8) NOT NULL,
+    id_periodo VARCHAR(255) NOT NULL,
     turma VARCHAR(8) NOT NULL,
     vagas_restantes INT NOT NULL,
     vagas_ocupadas INT NOT NULL,
 
     FOREIGN KEY (id_curso) REFERENCES Cursos(id_curso),
-    FOREIGN KEY (id_disc) REFERENCES Disciplinas(id_disc)
+    FOREIGN KEY (id_disc) REFERENCES Disciplinas(id_disc),
+    FOREIGN KEY (id_periodo) REFERENCES Periodos(id_periodo)
+);
+
+CREATE TABLE IF NOT EXISTS Locais (
+    id_local VARCHAR(16) PRIMARY KEY,
+    nome VARCHAR(255),
+    ocupacao INT
 );
 
 CREATE TABLE IF NOT EXISTS Aulas (
@@ -52,7 +69,8 @@ CREATE TABLE IF NOT EXISTS Aulas (
     hora_inicio INT NOT NULL,
     hora_fim INT NOT NULL,
 
-    FOREIGN KEY (id_oferta) REFERENCES OfertasDisciplina(id_oferta)
+    FOREIGN KEY (id_oferta) REFERENCES OfertasDisciplina(id_oferta),
+    FOREIGN KEY (nome_local) REFERENCES Locais(id_local)
 );
 
 CREATE TABLE IF NOT EXISTS Leciona (
@@ -66,64 +84,350 @@ CREATE TABLE IF NOT EXISTS Leciona (
 );
 '''
 
-def _build_sql_data(cursos: Sequence[RefCurso],
-                    disciplinas: Sequence[RefDisciplina],
-                    professores: Sequence[RefProfessor],
-                    periodo: RefPeriodo) -> str:
-    sb = StringIO()
-    def p(*args, **kwargs):
-        print(*args, **kwargs, file=sb)
+def _build_sql_indexes() -> str:
+    # created after the bulk insert, so they are built once instead of row by row;
+    # the Aulas ones hold every column, so the queries below never read the table.
+    # Full loads follow them with ANALYZE; incremental scripts keep the old statistics
+    return '''
+CREATE INDEX IF NOT EXISTS idx_aulas_oferta ON Aulas (id_oferta, dia_semana, hora_inicio, hora_fim, nome_local);
+CREATE INDEX IF NOT EXISTS idx_aulas_horario ON Aulas (dia_semana, hora_inicio, hora_fim, nome_local, id_oferta);
+CREATE INDEX IF NOT EXISTS idx_aulas_local ON Aulas (nome_local, dia_semana, hora_inicio, hora_fim, id_oferta);
+CREATE INDEX IF NOT EXISTS idx_leciona_oferta ON Leciona (id_oferta);
+CREATE INDEX IF NOT EXISTS idx_ofertas_periodo ON OfertasDisciplina (id_periodo);
+CREATE INDEX IF NOT EXISTS idx_ofertas_curso ON OfertasDisciplina (id_curso, id_periodo, id_disc, turma);
+CREATE INDEX IF NOT EXISTS idx_ofertas_disc ON OfertasDisciplina (id_disc, id_periodo);
+'''
+
+# what the web front end asks for; named parameters, see query_latency
+QUERIES = {
+    'grade_curso': '''
+SELECT d.id_disc, d.nome_disc, o.turma, a.dia_semana, a.hora_inicio, a.hora_fim, a.nome_local
+FROM OfertasDisciplina o
+JOIN Disciplinas d ON d.id_disc = o.id_disc
+JOIN Aulas a ON a.id_oferta = o.id_oferta
+WHERE o.id_curso = :curso AND o.id_periodo = :periodo
+ORDER BY a.dia_semana, a.hora_inicio''',
+    'aulas_horario': '''
+SELECT a.nome_local, o.id_disc, o.turma, a.hora_inicio, a.hora_fim
+FROM Aulas a
+JOIN OfertasDisciplina o ON o.id_oferta = a.id_oferta
+WHERE a.dia_semana = :dia AND a.hora_inicio <= :hora AND a.hora_fim > :hora AND o.id_periodo = :periodo''',
+    'uso_local': '''
+SELECT a.dia_semana, a.hora_inicio, a.hora_fim, o.id_disc, o.turma
+FROM Aulas a
+JOIN OfertasDisciplina o ON o.id_oferta = a.id_oferta
+WHERE a.nome_local = :local AND o.id_periodo = :periodo
+ORDER BY a.dia_semana, a.hora_inicio''',
+    'carga_professor': '''
+SELECT o.id_disc, o.turma, l.eh_principal, a.dia_semana, a.hora_inicio, a.hora_fim
+FROM Professores p
+JOIN Leciona l ON l.id_prof = p.id_prof
+JOIN OfertasDisciplina o ON o.id_oferta = l.id_oferta
+LEFT JOIN Aulas a ON a.id_oferta = o.id_oferta
+WHERE p.nome_prof = :professor AND o.id_periodo = :periodo''',
+    'ofertas_disciplina': '''
+SELECT o.turma, o.id_curso, o.vagas_restantes, o.vagas_ocupadas
+FROM OfertasDisciplina o
+WHERE o.id_disc = :disciplina AND o.id_periodo = :periodo''',
+}
+
+def query_latency(conn: sqlite3.Connection, params: dict[str, Any], seconds: float = 0.5) -> dict[str, tuple[float, int]]:
+    # mean seconds per run and row count of each of QUERIES, each run for about seconds
+    out = {}
+    for name, q in QUERIES.items():
+        n = 0
+        start = time.perf_counter()
+        while True:
+            rows = conn.execute(q, params).fetchall()
+            n += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= seconds: break
+        out[name] = (elapsed / n, len(rows))
+    return out
 
-    periodo = _RefPeriodo.d(periodo)
-    p(f"BEGIN TRANSACTION;")
+Row = tuple[str, tuple[Any, ...]]
+_DIAS = ['domingo', 'segunda', 'terça', 'quarta', 'quinta', 'sexta', 'sábado', 'N/A']
+RefPeriodos = RefPeriodo | Iterable[RefPeriodo] | None
+
+def _periodo_keys(periodo: RefPeriodos) -> Optional[set[str]]:
+    # one periodo, several, or None for every periodo with ofertas
+    if periodo is None: return None
+    if isinstance(periodo, (str, _RefPeriodo, Periodo)): periodo = [periodo]
+    return {_RefPeriodo.r(p).key for p in periodo}
+
+def _stable_id(*parts: str) -> int:
+    # the same entity gets the same id on every export: a hash of its SIG keys, cut to
+    # 53 bits so the web front end reads it exactly as a JavaScript number
+    digest = hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') >> 11
+
+def _sql_rows(cursos: Sequence[RefCurso],
+              disciplinas: Sequence[RefDisciplina],
+              professores: Sequence[RefProfessor],
+              periodo: RefPeriodos) -> Generator[Row, None, None]:
+    periodos = _periodo_keys(periodo)
     for curso in cursos:
         curso = _RefCurso.d(curso)
-        p(f"INSERT INTO Cursos VALUES ('{curso.key}', '{curso.nome}');")
+        yield 'Cursos', (curso.key, curso.nome)
 
     for disc in disciplinas:
         disc = _RefDisciplina.d(disc)
-        p(f"INSERT INTO Disciplinas VALUES ('{disc.key}', '{disc.nome}', {disc.creditos});")
+        yield 'Disciplinas', (disc.key, disc.nome, disc.creditos)
 
     for curso in cursos:
         curso = _RefCurso.d(curso)
         if not curso.matrizes: continue
         for per, discs in curso.matrizes[-1].obrigatorias.items():
             for discm in discs:
-                p(f"INSERT INTO DisciplinasMatriz VALUES ('{discm.disc}', '{curso.key}', {per}, NULL);")
+                yield 'DisciplinasMatriz', (str(discm.disc), curso.key, per, None)
         for cat, discs in curso.matrizes[-1].eletivas.items():
             for discm in discs:
-                p(f"INSERT INTO DisciplinasMatriz VALUES ('{discm.disc}', '{curso.key}', NULL, '{cat}');")
-
+                yield 'DisciplinasMatriz', (str(discm.disc), curso.key, None, cat)
 
-    dias = ['domingo', 'segunda', 'terça', 'quarta', 'quinta', 'sexta', 'sábado', 'N/A']
-    prof_ids = {}
     for prof in professores:
         pr = _RefProfessor.r(prof)
-        prof_ids[pr.key] = len(prof_ids)
-        p(f"INSERT INTO Professores VALUES ({prof_ids[pr.key]}, '{pr}', '{pr.deref.departamento}');")
-    i = 0
+        yield 'Professores', (_stable_id(pr.key), str(pr), pr.deref.departamento)
+    # every periodo in the same pass; a Periodos row the first time one shows up
+    seen: set[str] = set()
+    locais: set[str] = set()
     for disc in disciplinas:
         disc = _RefDisciplina.d(disc)
-        if periodo.key not in disc.ofertas: continue
-        for oferta in disc.ofertas[periodo.key]:
-            prof = _RefProfessor.r(oferta.professor_principal).key if oferta.professor_principal is not None else ''
-            aloc = oferta.professores_alocados + ([prof] if prof else [])
-            aloc = set([_RefProfessor.r(p).key for p in aloc])
-            i += 1
-            restantes = -1 if oferta.normal is None else oferta.normal.restantes
-            ocupadas = -1 if oferta.normal is None else oferta.normal.ocupadas
-            p(f"INSERT INTO OfertasDisciplina VALUES ({i}, '{oferta.curso}', '{disc}', '{oferta.turma}', {restantes}, {ocupadas});")
-            for pr in aloc:
-                p(f"INSERT INTO Leciona VALUES ({prof_ids[pr]}, {i}, {1 if pr == prof else 0});")
-            for aula in oferta.horarios:
-                local = _RefLocal.d(aula.local)
-                hora_fim = aula.fim.hora + (1 if aula.fim.minuto > 0 else 0)
-                p(f"INSERT INTO Aulas VALUES ({i}, '{local.abbr}', '{dias[aula.dia]}', {aula.inicio.hora}, {hora_fim});")
-    p(f"END TRANSACTION;")
-    return sb.getvalue()
+        for per, ofertas in disc.ofertas.items():
+            if periodos is not None and per not in periodos: continue
+            if per not in seen:
+                seen.add(per)
+                ref = _RefPeriodo.r(per)
+                yield 'Periodos', (per, ref.deref.sig_cod_int if ref.resolve() else None)
+            for oferta in ofertas:
+                prof = _RefProfessor.r(oferta.professor_principal).key if oferta.professor_principal is not None else ''
+                aloc = set([p.key for p in oferta.professores_alocados] + ([prof] if prof else []))
+                i = _stable_id(disc.key, per, oferta.turma)
+                restantes = -1 if oferta.normal is None else oferta.normal.restantes
+                ocupadas = -1 if oferta.normal is None else oferta.normal.ocupadas
+                yield 'OfertasDisciplina', (i, str(oferta.curso), str(disc), per, oferta.turma, restantes, ocupadas)
+                for pr in aloc:
+                    yield 'Leciona', (_stable_id(pr), i, 1 if pr == prof else 0)
+                for aula in oferta.horarios:
+                    # a Local's key is its abbr, no need to deref
+                    local = aula.local.key
+                    if local not in locais:
+                        locais.add(local)
+                        ref = _RefLocal.r(local)
+                        yield 'Locais', (local, ref.deref.local, ref.deref.ocupacao) if ref.resolve() else (local, None, None)
+                    hora_fim = aula.fim.hora + (1 if aula.fim.minuto > 0 else 0)
+                    yield 'Aulas', (i, local, _DIAS[aula.dia], aula.inicio.hora, hora_fim)
+
+def _sql_literal(v: Any) -> str:
+    if v is None: return 'NULL'
+    if isinstance(v, str): return "'" + v.replace("'", "''") + "'"
+    return str(v)
+
+def _batches(rows: Iterable[Row], size: int) -> Generator[tuple[str, list[tuple[Any, ...]]], None, None]:
+    # rows of the same table grouped up to size; at most one open batch per table
+    batches: dict[str, list[tuple[Any, ...]]] = {}
+    for table, row in rows:
+        batch = batches.setdefault(table, [])
+        batch.append(row)
+        if len(batch) >= size:
+            yield table, batch
+            batches[table] = []
+    for table, batch in batches.items():
+        if batch:
+            yield table, batch
+
+def write_sql(fp: TextIO,
+              cursos: Sequence[RefCurso],
+              disciplinas: Sequence[RefDisciplina],
+              professores: Sequence[RefProfessor],
+              periodo: RefPeriodos = None,
+              batch: int = 500) -> None:
+    fp.write(_build_sql_schema())
+    fp.write("BEGIN TRANSACTION;\n")
+    for table, rows in _batches(_sql_rows(cursos, disciplinas, professores, periodo), batch):
+        values = ',\n'.join(f"({', '.join(map(_sql_literal, row))})" for row in rows)
+        fp.write(f"INSERT INTO {table} VALUES {values};\n")
+    fp.write("END TRANSACTION;\n")
+    fp.write(_build_sql_indexes())
+    fp.write("ANALYZE;\n")
 
 def build_sql(cursos: Sequence[RefCurso],
               disciplinas: Sequence[RefDisciplina],
               professores: Sequence[RefProfessor],
-              periodo: RefPeriodo) -> str:
-    return _build_sql_schema() + _build_sql_data(cursos, disciplinas, professores, periodo)
+              periodo: RefPeriodos = None) -> str:
+    sb = StringIO()
+    write_sql(sb, cursos, disciplinas, professores, periodo, batch=1)
+    return sb.getvalue()
+
+_BATCH = 4096
+
+def load_sqlite(conn: sqlite3.Connection,
+                cursos: Sequence[RefCurso],
+                disciplinas: Sequence[RefDisciplina],
+                professores: Sequence[RefProfessor],
+                periodo: RefPeriodos = None) -> None:
+    conn.executescript(_build_sql_schema())
+    # bulk load settings, put back once the data is in
+    pragmas = {name: conn.execute(f'PRAGMA {name}').fetchone()[0] for name in ('synchronous', 'journal_mode', 'cache_size', 'temp_store')}
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA journal_mode = MEMORY')
+    conn.execute('PRAGMA cache_size = -65536')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    try:
+        with conn:
+            for table, rows in _batches(_sql_rows(cursos, disciplinas, professores, periodo), _BATCH):
+                conn.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(rows[0]))})", rows)
+        conn.executescript(_build_sql_indexes())
+        conn.execute('ANALYZE')
+    finally:
+        for name, value in pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+
+def _slice(curso: Optional[RefCurso], periodo: Optional[RefPeriodo]) -> tuple[str, list[str]]:
+    # condition on OfertasDisciplina o, served by idx_ofertas_curso / idx_ofertas_periodo
+    conds, params = [], []
+    if curso is not None:
+        conds.append('o.id_curso = ?')
+        params.append(_RefCurso.r(curso).key)
+    if periodo is not None:
+        conds.append('o.id_periodo = ?')
+        params.append(_RefPeriodo.r(periodo).key)
+    return ' AND '.join(conds) or '1', params
+
+def read_sqlite(conn: sqlite3.Connection,
+                curso: Optional[RefCurso] = None,
+                periodo: Optional[RefPeriodo] = None) -> None:
+    # registers what an export holds; with curso and/or periodo only the ofertas of that
+    # slice, and the disciplinas, professores and locais they use, are read.
+    # The export does not keep everything: situacao, professores_visitantes, especial,
+    # vagas pendentes, minutos and the matriz header come back empty, and
+    # oferecidas as ocupadas + restantes
+    with _loading():
+        where, params = _slice(curso, periodo)
+        partial = curso is not None or periodo is not None
+        c = _RefCurso.r(curso).key if curso is not None else None
+        p = _RefPeriodo.r(periodo).key if periodo is not None else None
+
+        def make(cls: type[RefBy], data: dict[str, Any]) -> None:
+            cls._register(construct(cls, data))
+
+        if partial:
+            locais = conn.execute(f'''SELECT DISTINCT l.id_local, l.nome, l.ocupacao FROM OfertasDisciplina o
+                JOIN Aulas a ON a.id_oferta = o.id_oferta JOIN Locais l ON l.id_local = a.nome_local WHERE {where}''', params)
+            professores = conn.execute(f'''SELECT DISTINCT p.nome_prof, p.departamento FROM OfertasDisciplina o
+                JOIN Leciona l ON l.id_oferta = o.id_oferta JOIN Professores p ON p.id_prof = l.id_prof WHERE {where}''', params)
+            matriz = 'SELECT id_disc FROM DisciplinasMatriz WHERE id_curso = ?' if c is not None else 'SELECT NULL WHERE 0'
+            disciplinas = conn.execute(f'''SELECT id_disc, nome_disc, creditos FROM Disciplinas WHERE id_disc IN
+                (SELECT o.id_disc FROM OfertasDisciplina o WHERE {where} UNION {matriz})''', params + ([c] if c is not None else []))
+        else:
+            locais = conn.execute('SELECT id_local, nome, ocupacao FROM Locais')
+            professores = conn.execute('SELECT nome_prof, departamento FROM Professores')
+            disciplinas = conn.execute('SELECT id_disc, nome_disc, creditos FROM Disciplinas')
+
+        for abbr, nome, ocupacao in locais.fetchall():
+            # locais that were never resolved were exported without nome
+            if nome is not None:
+                make(Local, {'abbr': abbr, 'local': nome, 'ocupacao': ocupacao})
+        for nome, departamento in professores.fetchall():
+            make(Professor, {'nome': nome, 'departamento': departamento})
+        for nome, sig_cod_int in conn.execute('SELECT id_periodo, sig_cod_int FROM Periodos' + (' WHERE id_periodo = ?' if p else ''), [p] if p else []):
+            make(Periodo, {'nome': nome, 'sig_cod_int': sig_cod_int or ''})
+
+        cursos: dict[str, dict[str, Any]] = {}
+        matrizes: dict[str, dict[str, Any]] = {}
+        for cod, nome in conn.execute('SELECT id_curso, nome_curso FROM Cursos' + (' WHERE id_curso = ?' if c else ''), [c] if c else []):
+            cursos[cod] = {'cod': cod, 'sig_cod_int': 0, 'nome': nome, 'matrizes': []}
+        for disc, cod, per, cat in conn.execute('SELECT id_disc, id_curso, periodo, cat_eletiva FROM DisciplinasMatriz' + (' WHERE id_curso = ?' if c else ''), [c] if c else []):
+            if cod not in cursos: continue
+            m = matrizes.get(cod)
+            if m is None:
+                m = matrizes[cod] = {'cod': '', 'sig_cod_int': 0, 'nome': '', 'descricao': '', 'periodos': 0, 'min_periodos': 0,
+                                     'max_periodos': 0, 'vagas': 0, 'obrigatorias': {}, 'eletivas': {}}
+                cursos[cod]['matrizes'].append(m)
+            dm = {'disc': disc, 'percentual': 0.0, 'reqs_fortes': [], 'reqs_minimos': [], 'coreqs': []}
+            if per is not None:
+                m['obrigatorias'].setdefault(per, []).append(dm)
+                m['periodos'] = m['min_periodos'] = m['max_periodos'] = max(m['periodos'], per)
+            else:
+                m['eletivas'].setdefault(cat, []).append(dm)
+        for data in cursos.values():
+            make(Curso, data)
+
+        ofertas: dict[int, dict[str, Any]] = {}
+        por_disc: dict[str, dict[str, list[dict[str, Any]]]] = {}
+        for i, cod, disc, per, turma, restantes, ocupadas in conn.execute(f'''SELECT o.id_oferta, o.id_curso, o.id_disc, o.id_periodo,
+                o.turma, o.vagas_restantes, o.vagas_ocupadas FROM OfertasDisciplina o WHERE {where}''', params):
+            normal = None if restantes == -1 and ocupadas == -1 else {
+                'oferecidas': ocupadas + restantes, 'ocupadas': ocupadas, 'restantes': restantes, 'pendentes': 0}
+            ofertas[i] = {'situacao': '', 'turma': turma, 'curso': cod, 'professor_principal': None, 'professores_alocados': [],
+                          'professores_visitantes': [], 'normal': normal, 'especial': None, 'horarios': [], 'semestre': None, 'bimestre': None}
+            por_disc.setdefault(disc, {}).setdefault(per, []).append(ofertas[i])
+        for i, principal, nome in conn.execute(f'''SELECT l.id_oferta, l.eh_principal, p.nome_prof FROM OfertasDisciplina o
+                JOIN Leciona l ON l.id_oferta = o.id_oferta JOIN Professores p ON p.id_prof = l.id_prof WHERE {where}''', params):
+            if principal:
+                ofertas[i]['professor_principal'] = nome
+            else:
+                ofertas[i]['professores_alocados'].append(nome)
+        for i, local, dia, inicio, fim in conn.execute(f'''SELECT a.id_oferta, a.nome_local, a.dia_semana, a.hora_inicio, a.hora_fim
+                FROM OfertasDisciplina o JOIN Aulas a ON a.id_oferta = o.id_oferta WHERE {where}''', params):
+            # 'N/A' is _DIAS[-1], a horario without a day
+            ofertas[i]['horarios'].append({'dia': -1 if dia == 'N/A' else _DIAS.index(dia), 'inicio': {'hora': inicio, 'minuto': 0},
+                                           'fim': {'hora': fim, 'minuto': 0}, 'local': local})
+        for cod, nome, creditos in disciplinas.fetchall():
+            make(Disciplina, {'cod': cod, 'nome': nome, 'creditos': creditos, 'ofertas': por_disc.get(cod, {})})
+
+# key columns of each table; Aulas has none, so the whole row is its key
+_KEYS = {
+    'Cursos': ('id_curso',),
+    'Disciplinas': ('id_disc',),
+    'DisciplinasMatriz': ('id_disc', 'id_curso'),
+    'Periodos': ('id_periodo',),
+    'Professores': ('id_prof',),
+    'OfertasDisciplina': ('id_oferta',),
+    'Locais': ('id_local',),
+    'Aulas': ('id_oferta', 'nome_local', 'dia_semana', 'hora_inicio', 'hora_fim'),
+    'Leciona': ('id_prof', 'id_oferta'),
+}
+
+# table -> row key -> digest of the row, as of the last export
+State = dict[str, dict[tuple[Any, ...], int]]
+
+def _digest(row: tuple[Any, ...]) -> int:
+    return int.from_bytes(hashlib.blake2b(repr(row).encode('utf-8'), digest_size=8).digest(), 'big')
+
+def write_sql_changes(fp: TextIO,
+                      previous: State,
+                      cursos: Sequence[RefCurso],
+                      disciplinas: Sequence[RefDisciplina],
+                      professores: Sequence[RefProfessor],
+                      periodo: RefPeriodos = None,
+                      batch: int = 500) -> State:
+    # only rows added, changed or removed since the export previous describes
+    state: State = {table: {} for table in _KEYS}
+
+    def changed(rows: Iterable[Row]) -> Generator[Row, None, None]:
+        for table, row in rows:
+            key = row[:len(_KEYS[table])]
+            h = state[table][key] = _digest(row)
+            if previous.get(table, {}).get(key) != h:
+                yield table, row
+
+    fp.write(_build_sql_schema())
+    fp.write("BEGIN TRANSACTION;\n")
+    for table, rows in _batches(changed(_sql_rows(cursos, disciplinas, professores, periodo)), batch):
+        values = ',\n'.join(f"({', '.join(map(_sql_literal, row))})" for row in rows)
+        fp.write(f"INSERT OR REPLACE INTO {table} VALUES {values};\n")
+
+    removed = ((table, key) for table, keys in previous.items() for key in keys if key not in state[table])
+    for table, keys in _batches(removed, batch):
+        columns = ', '.join(_KEYS[table])
+        values = ', '.join(f"({', '.join(map(_sql_literal, key))})" for key in keys)
+        fp.write(f"DELETE FROM {table} WHERE ({columns}) IN (VALUES {values});\n")
+    fp.write("END TRANSACTION;\n")
+    fp.write(_build_sql_indexes())
+    return state
+
+def dump_sql_state(fp: TextIO, state: State) -> None:
+    json.dump({table: [[*key, h] for key, h in rows.items()] for table, rows in state.items()}, fp, ensure_ascii=False)
+
+def load_sql_state(fp: TextIO) -> State:
+    return {table: {tuple(r[:-1]): r[-1] for r in rows} for table, rows in json.load(fp).items()}
@@ -0,0 +1,96 @@
+from typing import Any, Optional, BinaryIO
+from datetime import date
+import json
+import mmap
+import struct
+
+from . import model
+from .model import RefBy, Source
+
+MAGIC = b'UFSL'
+VERSION = 1
+
+# [magic][version][records...][index json][index offset: u64]
+_TRAILER = struct.Struct('<Q')
+
+def _key_str(k: Any) -> str:
+    return k.isoformat() if isinstance(k, date) else str(k)
+
+def dump(fp: BinaryIO) -> None:
+    fp.write(MAGIC + bytes([VERSION]))
+    offset = len(MAGIC) + 1
+    index: dict[str, dict[str, tuple[int, int]]] = {}
+    for name, cls in model._load_order:
+        section = index[name] = {}
+        for inst in cls._values():
+            record = json.dumps(inst.model_dump(), separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+            section[_key_str(inst.key)] = (offset, len(record))
+            fp.write(record)
+            offset += len(record)
+    fp.write(json.dumps(index, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+    fp.write(_TRAILER.pack(offset))
+
+class Store(Source):
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} is not a uflascrape store')
+        if self._mm[len(MAGIC)] != VERSION:
+            raise ValueError(f'Unsupported store version {self._mm[len(MAGIC)]}')
+        (index_offset,) = _TRAILER.unpack_from(self._mm, len(self._mm) - _TRAILER.size)
+        index = json.loads(self._mm[index_offset:len(self._mm) - _TRAILER.size])
+        self._index: dict[type[RefBy], dict[str, list[int]]] = {
+            cls: index.get(name, {}) for name, cls in model._load_order
+        }
+
+    def keys(self, cls: type[RefBy]) -> list[str]:
+        return list(self._index[cls])
+
+    def _materialize(self, cls: type[RefBy], entry: list[int]) -> RefBy:
+        offset, size = entry
+        inst = model.construct(cls, json.loads(self._mm[offset:offset + size]))
+        return cls._register(inst)
+
+    def fetch(self, cls: type[RefBy], k: Any) -> Optional[RefBy]:
+        # pop first so that _register does not come back here
+        entry = self._index[cls].pop(_key_str(k), None)
+        if entry is None: return None
+        return self._materialize(cls, entry)
+
+    def fetch_all(self, cls: type[RefBy]) -> None:
+        index = self._index[cls]
+        for k in list(index):
+            entry = index.pop(k, None)
+            if entry is not None:
+                self._materialize(cls, entry)
+
+    def attach(self) -> 'Store':
+        for cls in self._index:
+            if cls in model._sources:
+                raise RuntimeError(f'{cls.__name__} already has a source attached')
+        for cls in self._index:
+            model._sources[cls] = self
+        return self
+
+    def close(self) -> None:
+        for cls in self._index:
+            if model._sources.get(cls) is self:
+                del model._sources[cls]
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self) -> 'Store':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+def load(path: str) -> Store:
+    return Store(path).attach()
+
+__all__ = [
+    "Store",
+    "dump",
+    "load",
+]
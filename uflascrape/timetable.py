@@ -0,0 +1,128 @@
+from typing import Iterable, Generator, NamedTuple, Optional, Callable
+from itertools import product
+import heapq
+
+from .model import RefDisciplina, RefPeriodo, _RefDisciplina, _RefPeriodo, SLOT_DAYS, SLOT_HOURS
+from .query import Hit
+
+_DAY = (1 << SLOT_HOURS) - 1
+
+# ofertas of one disciplina that occupy exactly the same slots
+Group = tuple[int, list[Hit]]
+
+class Timetable(NamedTuple):
+    ofertas: tuple[Hit, ...]
+    slots: int
+    dias: int
+    """Quantidade de dias com aula"""
+    janelas: int
+    """Horas vagas entre aulas de um mesmo dia"""
+    restantes: int
+    """Soma das vagas restantes das turmas"""
+
+    @property
+    def score(self) -> tuple[int, int, int]:
+        return (self.dias, self.janelas, -self.restantes)
+
+def _restantes(hit: Hit) -> int:
+    return hit.oferta.normal.restantes if hit.oferta.normal is not None else 0
+
+def _dias(slots: int) -> int:
+    return sum(1 for d in range(SLOT_DAYS) if slots >> (d * SLOT_HOURS) & _DAY)
+
+def _janelas(slots: int) -> int:
+    janelas = 0
+    for d in range(SLOT_DAYS):
+        day = slots >> (d * SLOT_HOURS) & _DAY
+        if day:
+            low = (day & -day).bit_length() - 1
+            janelas += day.bit_length() - low - day.bit_count()
+    return janelas
+
+def _groups(disciplina: RefDisciplina, periodo: str) -> list[Group]:
+    disc = _RefDisciplina.d(disciplina)
+    by_mask: dict[int, list[Hit]] = {}
+    for oferta in disc.ofertas.get(periodo, []):
+        by_mask.setdefault(oferta.slots, []).append(Hit(disc, periodo, oferta))
+    groups = [(mask, sorted(hits, key=_restantes, reverse=True)) for mask, hits in by_mask.items()]
+    groups.sort(key=lambda g: _restantes(g[1][0]), reverse=True)
+    return groups
+
+def _search(options: list[list[Group]],
+            prune: Optional[Callable[[int], bool]] = None) -> Generator[tuple[int, list[Group]], None, None]:
+    # fewest alternatives first, so dead ends show up near the root;
+    # results are yielded back in the caller's order
+    order = sorted(range(len(options)), key=lambda i: len(options[i]))
+    options = [options[i] for i in order]
+    n = len(options)
+    chosen: list[Group] = []
+
+    def unsorted() -> list[Group]:
+        groups: list[Group] = [None] * n  # type: ignore[list-item]
+        for i, group in zip(order, chosen):
+            groups[i] = group
+        return groups
+
+    def viable(used: int, start: int) -> bool:
+        # forward check: every disciplina left still has a compatible turma
+        for groups in options[start:]:
+            if not any(mask & used == 0 for mask, _ in groups):
+                return False
+        return True
+
+    def dfs(i: int, used: int) -> Generator[tuple[int, list[Group]], None, None]:
+        if i == n:
+            yield used, unsorted()
+            return
+        for group in options[i]:
+            mask = group[0]
+            if mask & used: continue
+            u = used | mask
+            if prune is not None and prune(u): continue
+            if not viable(u, i + 1): continue
+            chosen.append(group)
+            yield from dfs(i + 1, u)
+            chosen.pop()
+
+    if all(options):
+        yield from dfs(0, 0)
+
+def _timetable(hits: Iterable[Hit], slots: int) -> Timetable:
+    hits = tuple(hits)
+    return Timetable(hits, slots, _dias(slots), _janelas(slots), sum(_restantes(h) for h in hits))
+
+def timetables(disciplinas: Iterable[RefDisciplina], periodo: RefPeriodo) -> Generator[Timetable, None, None]:
+    p = _RefPeriodo.r(periodo).key
+    options = [_groups(d, p) for d in disciplinas]
+    for slots, groups in _search(options):
+        for hits in product(*(g[1] for g in groups)):
+            yield _timetable(hits, slots)
+
+def best_timetables(disciplinas: Iterable[RefDisciplina], periodo: RefPeriodo, k: int = 10) -> list[Timetable]:
+    if k <= 0: return []
+    p = _RefPeriodo.r(periodo).key
+    options = [_groups(d, p) for d in disciplinas]
+    # max-heap on score (negated) holding the k best seen so far
+    heap: list[tuple[tuple[int, int, int], int, Timetable]] = []
+    counter = 0
+
+    def prune(used: int) -> bool:
+        # the number of days only grows as turmas are added
+        return len(heap) == k and _dias(used) > -heap[0][0][0]
+
+    for slots, groups in _search(options, prune):
+        for hits in product(*(g[1] for g in groups)):
+            t = _timetable(hits, slots)
+            key = tuple(-x for x in t.score)
+            counter += 1
+            if len(heap) < k:
+                heapq.heappush(heap, (key, counter, t))
+            elif key > heap[0][0]:
+                heapq.heapreplace(heap, (key, counter, t))
+    return [t for _, _, t in sorted(heap, key=lambda e: (e[2].score, e[1]))]
+
+__all__ = [
+    "Timetable",
+    "timetables",
+    "best_timetables",
+]